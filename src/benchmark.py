@@ -0,0 +1,209 @@
+import random
+import time
+
+import pandas as pd
+
+from converter import tables_to_dataframe
+from timetables import (
+    compile_course_index,
+    day_wise_filter,
+    find_best_timetables,
+    generate_timetables_without_clashes,
+)
+from visualize import (
+    convert_timetable_to_pandas_dataframe,
+    convert_timetables_to_pandas_dataframes,
+)
+
+
+def synthetic_tables(n_pages: int, rows_per_page: int = 30) -> list[list[list[str]]]:
+    """
+    Function to make up the tables of a many page timetable pdf, as extracted by pdfplumber (13 columns per row, like the real one).
+
+    Args:
+        n_pages (int): The number of pages.
+        rows_per_page (int, optional): The number of rows on each page. Defaults to 30.
+
+    Returns:
+        list[list[list[str]]]: The table of each page.
+    """
+    return [
+        [
+            [str(page), f"CS F{row:03d}", "COURSE", "3", "0", "3", "L1"]
+            + ["INSTRUCTOR", "F101", "M W F", "2", "03/03 4.00 - 05.30PM", "02/05AN"]
+            for row in range(rows_per_page)
+        ]
+        for page in range(n_pages)
+    ]
+
+
+def synthetic_timetables(n_courses: int, n_timetables: int = 1) -> list[dict]:
+    """
+    Function to make up exported timetables (as in my_timetables.json) with many courses.
+
+    Args:
+        n_courses (int): The number of courses in each timetable.
+        n_timetables (int, optional): The number of timetables. Defaults to 1.
+
+    Returns:
+        list[dict]: List of the timetables (all the same).
+    """
+    timetable = {}
+    for i in range(n_courses):
+        timetable[f"CS F{i:03d}"] = {
+            "sections": {
+                "L1": {"schedule": [{"days": ["M", "W", "F"], "hours": [i % 9 + 1]}]},
+                "P1": {"schedule": [{"days": ["T"], "hours": [7, 8]}]},
+            },
+            "exams": {
+                "midsem": f"{i % 28 + 1:02d}/03 4.00 - 05.30PM",
+                "compre": f"{i % 28 + 1:02d}/05 AN",
+            },
+        }
+    return [
+        {"free_matched": 0, "daily_scores": [], "timetable": timetable}
+    ] * n_timetables
+
+
+def synthetic_courses(n_courses: int, seed: int = 0) -> dict:
+    """
+    Function to make up a filtered json file (as from get_filtered_json) whose timetables tie a lot: every section has one or two classes on a few days and hours, so many timetables have the same daily scores.
+
+    Args:
+        n_courses (int): The number of courses (CDCs).
+        seed (int, optional): The seed of the random choices. Defaults to 0.
+
+    Returns:
+        dict: The filtered json file.
+    """
+    rng = random.Random(seed)
+    days = rng.choice([["M"], ["M", "T"], ["M", "T", "W"]])
+    hours = list(range(1, rng.choice([3, 6, 10])))
+    courses = {}
+    for i in range(n_courses):
+        sections = {}
+        for j in range(rng.randint(1, 5)):
+            schedule = [
+                {"days": [rng.choice(days)], "hours": [rng.choice(hours)]}
+                for _ in range(rng.randint(1, 2))
+            ]
+            sections[f"L{j + 1}"] = {"schedule": schedule}
+        courses[f"CS F{i:03d}"] = {
+            "sections": sections,
+            "exams": [{}],
+            "exams_iso": [{}],
+        }
+    return {"CDCs": courses, "DEls": {}, "HUELs": {}, "OPELs": {}}
+
+
+def concat_page_by_page(tables: list[list[list[str]]]) -> pd.DataFrame:
+    """
+    Function that combines the tables the way convert_timetable_to_csv used to (one pd.concat per page), for comparison.
+
+    Args:
+        tables (list[list[list[str]]]): The table of each page.
+
+    Returns:
+        pd.DataFrame: The timetable as a pandas dataframe.
+    """
+    df = pd.DataFrame()
+    for table in tables:
+        df = pd.concat([df, pd.DataFrame(table)])
+    return df
+
+
+def benchmark(function, argument) -> float:
+    """
+    Function to time a function call.
+
+    Args:
+        function: The function to time.
+        argument: The argument to call it with.
+
+    Returns:
+        float: The time taken in seconds.
+    """
+    start = time.perf_counter()
+    function(argument)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    # if the time per page (or per course) stays flat as the input doubles, the scaling is linear
+    print("Combining pages (converter):")
+    for n_pages in [100, 200, 400, 800]:
+        tables = synthetic_tables(n_pages)
+        new = benchmark(tables_to_dataframe, tables)
+        old = benchmark(concat_page_by_page, tables)
+        print(
+            f"{n_pages:5d} pages: {new:.3f}s ({new / n_pages * 1000:.3f}ms per page),",
+            f"page by page: {old:.3f}s ({old / n_pages * 1000:.3f}ms per page)",
+        )
+
+    print("\nBuilding the schedules (visualize):")
+    for n_courses in [100, 200, 400, 800]:
+        timetables = synthetic_timetables(n_courses)
+        taken = benchmark(
+            lambda timetables: convert_timetable_to_pandas_dataframe(timetables, 0),
+            timetables,
+        )
+        print(
+            f"{n_courses:5d} courses: {taken:.3f}s ({taken / n_courses * 1000:.3f}ms per course)"
+        )
+
+    print("\nBuilding the expanded class schedules of many timetables (visualize):")
+    for n_timetables in [25, 50, 100, 200]:
+        timetables = synthetic_timetables(10, n_timetables)
+        batch = benchmark(
+            lambda timetables: convert_timetables_to_pandas_dataframes(
+                timetables, list(range(len(timetables)))
+            ),
+            timetables,
+        )
+        one_by_one = benchmark(
+            lambda timetables: [
+                convert_timetable_to_pandas_dataframe(timetables, i, False)
+                for i in range(len(timetables))
+            ],
+            timetables,
+        )
+        print(
+            f"{n_timetables:5d} timetables: {batch:.3f}s ({batch / n_timetables * 1000:.3f}ms per timetable),",
+            f"one by one: {one_by_one:.3f}s ({one_by_one / n_timetables * 1000:.3f}ms per timetable)",
+        )
+
+    # the branch and bound search has to break ties the same way as sorting all the timetables, so the results are compared as well
+    print("\nFinding the best timetables (timetables):")
+    lite_order = ["M", "T", "W", "Th", "F", "S", "Su"]
+    n_checked = 0
+    search_time = sort_time = 0.0
+    for seed in range(2000):
+        index = compile_course_index(synthetic_courses(seed % 4 + 3, seed))
+        n_best = seed % 6 + 1
+        free_days = [[], ["M"], ["M", "T"]][seed % 3]
+        for filter, strong in [(False, False), (True, False), (True, True)]:
+            start = time.perf_counter()
+            best = find_best_timetables(
+                index, 0, 0, 0, free_days, lite_order, n_best, filter, strong
+            )
+            search_time += time.perf_counter() - start
+            start = time.perf_counter()
+            expected = day_wise_filter(
+                generate_timetables_without_clashes(index, 0, 0, 0),
+                index,
+                free_days,
+                lite_order,
+                filter,
+                strong,
+                n_best,
+            )
+            sort_time += time.perf_counter() - start
+            if best != expected:
+                raise Exception(
+                    f"find_best_timetables differs from day_wise_filter (seed {seed})"
+                )
+            n_checked += 1
+    print(
+        f"{n_checked:5d} searches: {search_time:.3f}s,",
+        f"sorting all the timetables: {sort_time:.3f}s, same results",
+    )
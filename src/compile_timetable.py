@@ -0,0 +1,195 @@
+import json
+import os
+
+import numpy as np
+
+from course_index import (
+    DAYS,
+    N_WORDS,
+    get_day_loads,
+    get_slot_mask,
+    parse_exam_interval,
+)
+
+
+def compile_timetable(json_file: str, output_dir: str) -> None:
+    """
+    Function to compile the main timetable json file into a compact binary form, so that the timetables script does not need to load the whole json file every time.
+    Every array is saved as its own .npy file, which can be memory mapped, so loading a few courses only reads those courses from disk:
+        course_codes.npy: BITS code of each course, sorted (to look courses up with a binary search)
+        course_details.npy, course_offsets.npy: json of each course (as in the main json file, without indentation), one after the other as bytes, and where each one starts
+        section_offsets.npy, section_names.npy: where the sections of each course start, and the name of each section
+        section_masks.npy: slot bitmask of each section (see get_slot_mask), split into N_WORDS 64 bit words
+        section_loads.npy: number of classes on each day for each section (see get_day_loads)
+        section_valid.npy: whether the schedule of each section could be compiled (eg: no unknown days)
+        course_exams.npy: exam slot id of the midsem and compre of each course (-1 if there is no such exam)
+        exam_intervals.npy: start and end of each exam slot (UTC)
+
+    Args:
+        json_file (str): The path to the main timetable json file.
+        output_dir (str): The directory to save the compiled timetable in.
+    """
+    with open(json_file, "r") as f:
+        timetable = json.load(f)
+    courses = timetable["courses"]
+    codes = sorted(courses)
+
+    details = []
+    section_offsets = [0]
+    section_names = []
+    section_masks = []
+    section_loads = []
+    section_valid = []
+    course_exams = []
+    exam_ids: dict[str, int] = {}
+    exam_intervals = []
+    for code in codes:
+        course = courses[code]
+        details.append(json.dumps(course, separators=(",", ":")).encode())
+
+        for sec, sec_details in course["sections"].items():
+            section_names.append(sec)
+            try:
+                mask = get_slot_mask(sec_details["schedule"])
+                loads = get_day_loads(sec_details["schedule"])
+                section_valid.append(True)
+            except Exception:
+                # compiled anyway, the error is raised if the course is ever selected
+                mask = 0
+                loads = (0,) * len(DAYS)
+                section_valid.append(False)
+            section_masks.append(
+                [mask >> (64 * w) & (2**64 - 1) for w in range(N_WORDS)]
+            )
+            section_loads.append(loads)
+        section_offsets.append(len(section_names))
+
+        slots = []
+        for exam in ("midsem", "compre"):
+            time = (course.get("exams_iso") or [{}])[0].get(exam)
+            if time is None:
+                slots.append(-1)
+                continue
+            if time not in exam_ids:
+                exam_ids[time] = len(exam_intervals)
+                exam_intervals.append(parse_exam_interval(time))
+            slots.append(exam_ids[time])
+        course_exams.append(slots)
+
+    course_offsets = np.cumsum([0] + [len(detail) for detail in details])
+    arrays = {
+        "course_codes": np.array(codes, dtype=str),
+        "course_details": np.frombuffer(b"".join(details), dtype=np.uint8),
+        "course_offsets": course_offsets.astype(np.int64),
+        "section_offsets": np.array(section_offsets, dtype=np.int64),
+        "section_names": np.array(section_names, dtype=str),
+        "section_masks": np.array(section_masks, dtype=np.uint64).reshape(-1, N_WORDS),
+        "section_loads": np.array(section_loads, dtype=np.uint8).reshape(-1, len(DAYS)),
+        "section_valid": np.array(section_valid, dtype=bool),
+        "course_exams": np.array(course_exams, dtype=np.int32).reshape(-1, 2),
+        "exam_intervals": np.array(exam_intervals, dtype="datetime64[s]").reshape(
+            -1, 2
+        ),
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(output_dir, name + ".npy"), array)
+
+    # the json file it was compiled from, to know when it has to be compiled again
+    source = os.stat(json_file)
+    metadata = {
+        "metadata": timetable["metadata"],
+        "source": {"size": source.st_size, "mtime_ns": source.st_mtime_ns},
+    }
+    with open(os.path.join(output_dir, "metadata.json"), "w") as f:
+        json.dump(metadata, f, indent=4)
+
+
+def is_compiled(json_file: str, output_dir: str) -> bool:
+    """
+    Function to check if the compiled timetable is up to date with the main timetable json file (eg: it was not edited after compiling).
+
+    Args:
+        json_file (str): The path to the main timetable json file.
+        output_dir (str): The directory the compiled timetable is saved in.
+
+    Returns:
+        bool: True if the compiled timetable is up to date, False otherwise.
+    """
+    try:
+        with open(os.path.join(output_dir, "metadata.json"), "r") as f:
+            source = json.load(f)["source"]
+    except FileNotFoundError:
+        return False
+    current = os.stat(json_file)
+    return source == {"size": current.st_size, "mtime_ns": current.st_mtime_ns}
+
+
+def load_compiled_timetable(
+    output_dir: str,
+    CDCs: list[str],
+    DEls: list[str],
+    HUELs: list[str],
+    OPELs: list[str],
+) -> tuple[dict, dict, dict]:
+    """
+    Function to load only the selected courses from the compiled timetable. Does the same as get_filtered_json on the main json file, without loading the whole of it.
+
+    Args:
+        output_dir (str): The directory the compiled timetable is saved in.
+        CDCs (list[str]): list of BITS codes for CDCs selected
+        DEls (list[str]): list of BITS codes for DEls selected
+        HUELs (list[str]): list of BITS codes for HUELs selected
+        OPELs (list[str]): list of BITS codes for OPELs selected
+
+    Returns:
+        tuple[dict, dict, dict]: filtered json file, i.e, with only courses selected, the (slot bitmask, daily loads) of each (course, section) of those courses, and the (start, end) of the midsem and compre of each of those courses (see compile_course_index)
+    """
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(output_dir, name + ".npy"), mmap_mode="r")
+
+    codes = load("course_codes")
+    details = load("course_details")
+    course_offsets = load("course_offsets")
+    section_offsets = load("section_offsets")
+    section_names = load("section_names")
+    section_masks = load("section_masks")
+    section_loads = load("section_loads")
+    section_valid = load("section_valid")
+    course_exams = load("course_exams")
+    exam_intervals = load("exam_intervals")
+
+    filtered_json = {"CDCs": {}, "DEls": {}, "HUELs": {}, "OPELs": {}}
+    sections = {}
+    exams = {}
+    for type, selected in (
+        ("CDCs", CDCs),
+        ("DEls", DEls),
+        ("HUELs", HUELs),
+        ("OPELs", OPELs),
+    ):
+        for code in selected:
+            i = int(np.searchsorted(codes, code))
+            if i == len(codes) or codes[i] != code:
+                raise KeyError(code)
+            detail = details[course_offsets[i] : course_offsets[i + 1]].tobytes()
+            filtered_json[type][code] = json.loads(detail)
+            # exam slot ids index into the exam intervals, -1 if there is no such exam
+            exams[code] = tuple(
+                tuple(exam_intervals[slot].tolist()) if slot >= 0 else None
+                for slot in course_exams[i].tolist()
+            )
+            for j in range(section_offsets[i], section_offsets[i + 1]):
+                # sections that could not be compiled are left to CourseIndex, which raises the error
+                if section_valid[j]:
+                    mask = 0
+                    for w in range(N_WORDS):
+                        mask |= int(section_masks[j, w]) << (64 * w)
+                    loads = tuple(section_loads[j].tolist())
+                    sections[(code, str(section_names[j]))] = (mask, loads)
+    return filtered_json, sections, exams
+
+
+if __name__ == "__main__":
+    compile_timetable("./files/timetable.json", "./files/compiled")
@@ -1,5 +1,11 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pdfplumber
 import pandas as pd
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
 
 
 def remove_headers(
@@ -27,6 +33,22 @@ def remove_headers(
     return new_table
 
 
+def tables_to_dataframe(tables: list[list[list[str]]]) -> pd.DataFrame:
+    """
+    Function to combine the tables extracted from the pages into one dataframe.
+
+    Args:
+        tables (list[list[list[str]]]): The tables extracted from each page, in page order.
+
+    Returns:
+        pd.DataFrame: The timetable as a pandas dataframe.
+    """
+    if not tables:
+        return pd.DataFrame()
+    # concatenated once at the end, concatenating page by page copies everything so far for every page
+    return pd.concat([pd.DataFrame(table) for table in tables])
+
+
 def convert_timetable_to_csv(
     pages: list[pdfplumber.page.Page], headers: list[str]
 ) -> pd.DataFrame():
@@ -40,15 +62,201 @@ def convert_timetable_to_csv(
     Returns:
         pd.DataFrame(): The timetable as a pandas dataframe.
     """
-    df = pd.DataFrame()
+    tables = []
     for page in pages:
         table = page.extract_table()
         table = remove_headers(
             table,
             headers,
         )
-        df = pd.concat([df, pd.DataFrame(table)])
-    return df
+        tables.append(table)
+    return tables_to_dataframe(tables)
+
+
+def extract_page_tables(
+    file: str, page_numbers: list[int], headers: list[str]
+) -> list[list[list[str]]]:
+    """
+    Function to extract the tables from some pages of the pdf, in a worker process. Each worker opens the pdf itself, as pdfplumber pages cannot be sent between processes.
+
+    Args:
+        file (str): The path to the pdf file.
+        page_numbers (list[int]): The pages to extract the tables from (0-indexed).
+        headers (list[str]): The headers to remove from the tables.
+
+    Returns:
+        list[list[list[str]]]: The table of each page, with the headers removed.
+    """
+    tables = []
+    with pdfplumber.open(file) as pdf:
+        for page_number in page_numbers:
+            table = pdf.pages[page_number].extract_table()
+            tables.append(remove_headers(table, headers))
+    return tables
+
+
+def convert_timetable_to_csv_parallel(
+    file: str, page_range: list[int], headers: list[str], n_workers: int = None
+) -> pd.DataFrame:
+    """
+    Function to convert the timetable to a pandas dataframe, extracting the pages on multiple cores.
+    The pages are split into contiguous ranges, one per worker, and the tables are put back together in page order, so the dataframe is the same as with convert_timetable_to_csv.
+
+    Args:
+        file (str): The path to the pdf file.
+        page_range (list[int]): The pages to extract the timetable from, as [from, to] (1-indexed, inclusive).
+        headers (list[str]): The headers to remove from the table.
+        n_workers (int, optional): The number of worker processes. Defaults to None (number of cores).
+
+    Returns:
+        pd.DataFrame: The timetable as a pandas dataframe.
+    """
+    with pdfplumber.open(file) as pdf:
+        # same pages as pdf.pages[page_range[0] - 1 : page_range[1]]
+        page_numbers = list(range(len(pdf.pages)))[page_range[0] - 1 : page_range[1]]
+    return tables_to_dataframe(
+        extract_tables_parallel(file, page_numbers, headers, n_workers)
+    )
+
+
+def extract_tables_parallel(
+    file: str, page_numbers: list[int], headers: list[str], n_workers: int = None
+) -> list[list[list[str]]]:
+    """
+    Function to extract the tables from some pages of the pdf on multiple cores.
+
+    Args:
+        file (str): The path to the pdf file.
+        page_numbers (list[int]): The pages to extract the tables from (0-indexed).
+        headers (list[str]): The headers to remove from the tables.
+        n_workers (int, optional): The number of worker processes. Defaults to None (number of cores).
+
+    Returns:
+        list[list[list[str]]]: The table of each page, in page order, with the headers removed.
+    """
+    if not page_numbers:
+        return []
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    # contiguous ranges of pages, so each worker only opens the pdf once
+    size = -(-len(page_numbers) // n_workers)
+    chunks = [page_numbers[i : i + size] for i in range(0, len(page_numbers), size)]
+    with ProcessPoolExecutor(n_workers) as executor:
+        results = executor.map(
+            extract_page_tables,
+            [file] * len(chunks),
+            chunks,
+            [headers] * len(chunks),
+        )
+        return [table for result in results for table in result]
+
+
+def get_object_hash(obj: object, hashes: dict[int, bytes]) -> bytes:
+    """
+    Function to hash a pdf object along with everything it refers to (eg: a font with its encoding, ToUnicode map and font file).
+
+    Args:
+        obj (object): The pdf object to hash.
+        hashes (dict[int, bytes]): The hash of each indirect object hashed so far, by its id, so objects shared by many pages (eg: fonts) are only hashed once.
+
+    Returns:
+        bytes: The hash of the object.
+    """
+    if isinstance(obj, PDFObjRef):
+        if obj.objid not in hashes:
+            # placeholder, in case the object refers back to itself
+            hashes[obj.objid] = b""
+            hashes[obj.objid] = get_object_hash(obj.resolve(), hashes)
+        return hashes[obj.objid]
+    if isinstance(obj, PDFStream):
+        obj_hash = hashlib.sha256(b"stream")
+        obj_hash.update(get_object_hash(obj.attrs, hashes))
+        obj_hash.update(obj.get_data())
+    elif isinstance(obj, dict):
+        obj_hash = hashlib.sha256(b"dict")
+        for key in sorted(obj):
+            obj_hash.update(repr(key).encode())
+            obj_hash.update(get_object_hash(obj[key], hashes))
+    elif isinstance(obj, (list, tuple)):
+        obj_hash = hashlib.sha256(b"list")
+        for item in obj:
+            obj_hash.update(get_object_hash(item, hashes))
+    else:
+        obj_hash = hashlib.sha256(repr(obj).encode())
+    return obj_hash.digest()
+
+
+def get_page_hash(page: pdfplumber.page.Page, hashes: dict[int, bytes] = None) -> str:
+    """
+    Function to hash the content of a page, without extracting anything from it. Pages with the same hash have the same table.
+    The resources of the page (fonts, XObjects, etc.) are hashed along with its content streams, as the same content can be decoded into different text with different fonts.
+
+    Args:
+        page (pdfplumber.page.Page): The page to hash.
+        hashes (dict[int, bytes], optional): The hash of each indirect object of the pdf hashed so far (see get_object_hash), to share between the pages of a pdf. Defaults to None.
+
+    Returns:
+        str: The hash of the page.
+    """
+    if hashes is None:
+        hashes = {}
+    page_hash = hashlib.sha256(repr(page.bbox).encode())
+    for stream in resolve1(page.page_obj.contents) or []:
+        page_hash.update(resolve1(stream).get_data())
+    page_hash.update(get_object_hash(page.page_obj.resources, hashes))
+    return page_hash.hexdigest()
+
+
+def convert_timetable_to_csv_incremental(
+    file: str,
+    page_range: list[int],
+    headers: list[str],
+    cache_file: str,
+    n_workers: int = None,
+) -> tuple[pd.DataFrame, list[int]]:
+    """
+    Function to convert the timetable to a pandas dataframe, only extracting the pages that changed since the last time.
+    The table of every page is cached by the hash of the page content, so when a revised pdf comes out, only the pages that are new or different are extracted again (on multiple cores).
+    The dataframe is the same as with convert_timetable_to_csv.
+
+    Args:
+        file (str): The path to the pdf file.
+        page_range (list[int]): The pages to extract the timetable from, as [from, to] (1-indexed, inclusive).
+        headers (list[str]): The headers to remove from the table.
+        cache_file (str): The path to the json file the tables of the pages are cached in (created if it does not exist).
+        n_workers (int, optional): The number of worker processes. Defaults to None (number of cores).
+
+    Returns:
+        tuple[pd.DataFrame, list[int]]: The timetable as a pandas dataframe, and the pages that had to be extracted (1-indexed).
+    """
+    # format: {page hash: table of the page (with the headers)}
+    cache: dict[str, list[list[str]]] = {}
+    if os.path.exists(cache_file):
+        with open(cache_file, "r") as f:
+            cache = json.load(f)
+
+    with pdfplumber.open(file) as pdf:
+        # same pages as pdf.pages[page_range[0] - 1 : page_range[1]]
+        page_numbers = list(range(len(pdf.pages)))[page_range[0] - 1 : page_range[1]]
+        hashes = {}
+        page_hashes = [get_page_hash(pdf.pages[i], hashes) for i in page_numbers]
+
+    # pages not in the cache, pages with the same content are only extracted once
+    changed = {}
+    for page_number, page_hash in zip(page_numbers, page_hashes):
+        if page_hash not in cache and page_hash not in changed:
+            changed[page_hash] = page_number
+    # headers are removed after caching, so that changing them does not need the pages to be extracted again
+    tables = extract_tables_parallel(file, list(changed.values()), [], n_workers)
+    cache.update(zip(changed.keys(), tables))
+
+    # only keep the pages of this pdf in the cache
+    cache = {page_hash: cache[page_hash] for page_hash in page_hashes}
+    with open(cache_file, "w") as f:
+        json.dump(cache, f)
+
+    tables = [remove_headers(cache[page_hash], headers) for page_hash in page_hashes]
+    return tables_to_dataframe(tables), [page + 1 for page in changed.values()]
 
 
 if __name__ == "__main__":
@@ -62,12 +270,31 @@ if __name__ == "__main__":
     # path to the pdf file
     file: str = r"./files/timetable.pdf"
 
-    pdf: pdfplumber.pdf.PDF = pdfplumber.open(file)
+    # tables of the pages extracted before, so that only the pages that changed in a revised pdf are extracted again
+    cache_file: str = r"./files/page_cache.json"
+
+    # only extract the pages that changed since the last time, using the page cache (gives the same csv as extracting all of them)
+    incremental: bool = True
+
+    # extract the pages on all cores (gives the same csv as extracting them one by one)
+    parallel: bool = True
+
+    if incremental:
+        data, changed_pages = convert_timetable_to_csv_incremental(
+            file, page_range, headers, cache_file, None if parallel else 1
+        )
+        print("Pages extracted:", changed_pages)
+    elif parallel:
+        data: pd.DataFrame = convert_timetable_to_csv_parallel(
+            file, page_range, headers
+        )
+    else:
+        pdf: pdfplumber.pdf.PDF = pdfplumber.open(file)
 
-    # might need to play around with the +-1, depending on how the pdf is formatted and how pdfplumber extracts the pages
-    pages: list[pdfplumber.page.Page] = pdf.pages[page_range[0] - 1 : page_range[1]]
+        # might need to play around with the +-1, depending on how the pdf is formatted and how pdfplumber extracts the pages
+        pages: list[pdfplumber.page.Page] = pdf.pages[page_range[0] - 1 : page_range[1]]
 
-    data: pd.DataFrame = convert_timetable_to_csv(pages, headers)
+        data: pd.DataFrame = convert_timetable_to_csv(pages, headers)
 
     # output the dataframe to csv
     data.to_csv("./files/output.csv", index=False)
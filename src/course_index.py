@@ -0,0 +1,332 @@
+from datetime import datetime
+from itertools import product
+
+import numpy as np
+
+# days of the week in the order used throughout (M, T, W, Th, F, S, Su)
+DAYS = ["M", "T", "W", "Th", "F", "S", "Su"]
+
+# number of hours in a day that can be scheduled (1: 8AM, ..., 14: 9PM)
+N_HOURS = 14
+
+# number of 64 bit words needed to hold a slot bitmask (7 days x 14 hours = 98 bits)
+N_WORDS = (len(DAYS) * N_HOURS + 63) // 64
+
+# bitmask of all the hours in each day
+DAY_MASKS = {day: ((1 << N_HOURS) - 1) << (i * N_HOURS) for i, day in enumerate(DAYS)}
+
+
+def get_slot_mask(schedule: list[dict]) -> int:
+    """
+    Function to encode the schedule of a section as a bitmask of 7 days x 14 hours.
+    Bit (day * 14 + hour - 1) is set if the section has a class in that slot, so two sections clash if and only if their masks share a bit.
+
+    Args:
+        schedule (list[dict]): schedule of the section from the main json file
+
+    Returns:
+        int: bitmask of the slots used by the section
+    """
+    mask = 0
+    for sched in schedule:
+        for day, hour in product(sched["days"], sched["hours"]):
+            if day not in DAY_MASKS:
+                raise Exception(f"Unknown day {day} in schedule")
+            if not 1 <= hour <= N_HOURS:
+                raise Exception(f"Unknown hour {hour} in schedule")
+            mask |= 1 << (DAYS.index(day) * N_HOURS + hour - 1)
+    return mask
+
+
+def parse_exam_interval(exam_iso: str) -> tuple[datetime, datetime]:
+    """
+    Function to parse an exam time from the exams_iso of the main json file into its start and end
+
+    Args:
+        exam_iso (str): exam time in ISO format (example: "2023-03-13T11:30:00|2023-03-13T13:00:00")
+
+    Returns:
+        tuple[datetime, datetime]: start and end of the exam
+    """
+    start, end = exam_iso.split("|")
+    return datetime.fromisoformat(start), datetime.fromisoformat(end)
+
+
+def get_day_loads(schedule: list[dict]) -> tuple[int, ...]:
+    """
+    Function to count the number of classes a section has on each day (a class spanning multiple hours counts once)
+
+    Args:
+        schedule (list[dict]): schedule of the section from the main json file
+
+    Returns:
+        tuple[int, ...]: number of classes on each day, in the order (M, T, W, Th, F, S, Su)
+    """
+    loads = [0] * len(DAYS)
+    for sched in schedule:
+        for day in sched["days"]:
+            loads[DAYS.index(day)] += 1
+    return tuple(loads)
+
+
+class CourseIndex:
+    """
+    Compiled form of the filtered json file, built once before generating timetables.
+    Courses and sections are given integer ids, and everything the timetable generation needs is stored in flat lists indexed by those ids, so no nested dictionaries need to be walked while checking timetables.
+
+    Attributes:
+        course_codes (list[str]): BITS code of each course
+        course_types (list[str]): category of each course (CDCs, DEls, HUELs or OPELs)
+        course_exams (list[dict]): exam details of each course, as in the main json file
+        course_exam_slots (list[int]): bitset of the exam slots of each course (midsem and compre)
+        course_exam_overlaps (list[int]): bitset of the exam slots overlapping some exam of each course, so two courses clash if one's exam slots and the other's overlaps share a bit
+        course_sections (list[list[int]]): section ids of each course
+        course_combinations (list[list[int]]): ids of the possible section combinations of each course
+        section_courses (list[int]): course id of each section
+        section_names (list[str]): name of each section (L1, T2, P3, ...)
+        section_masks (list[int]): slot bitmask of each section
+        section_loads (list[tuple[int, ...]]): number of classes on each day for each section
+        section_schedules (list[list[dict]]): schedule of each section, as in the main json file
+        combination_courses (list[int]): course id of each section combination
+        combination_options (list[tuple[str, tuple[str, ...]]]): (course, section combination) of each section combination
+        combination_masks (list[int]): slot bitmask of each section combination
+        combination_loads (list[tuple[int, ...]]): number of classes on each day for each section combination
+        valid_combinations (int): bitset of the section combinations whose sections do not clash with each other
+        compatible (list[int]): row of the compatibility matrix for each section combination, as a bitset of the combinations of other courses it can be taken with (no class or exam clashes)
+        combination_id_dtype (np.dtype): smallest integer type that fits every section combination id (uint16, or uint32 if there are too many), for arrays of timetables
+        combination_day_loads (np.ndarray): number of classes on each day for each section combination, shape (number of combinations, 7)
+        combination_day_hours (np.ndarray): bitmask of the hours with a class on each day (bit hour - 1) for each section combination, shape (number of combinations, 7)
+        combination_words (np.ndarray): slot bitmask of each section combination split into 64 bit words, shape (number of combinations, N_WORDS), for checking clashes of many timetables at once
+        combination_valid (np.ndarray): whether the sections of each section combination do not clash with each other (bool)
+        combination_course_ids (np.ndarray): course id of each section combination
+        course_exam_clashes (np.ndarray): whether each pair of courses has overlapping exams, shape (number of courses, number of courses)
+        exam_times (list[str]): exam time of each exam slot, in ISO format as in exams_iso
+        exam_intervals (list[tuple[datetime, datetime]]): start and end of each exam slot
+        course_ids (dict[str, int]): course id of each BITS code
+        section_ids (dict[tuple[str, str], int]): section id of each (course, section)
+    """
+
+    def __init__(
+        self,
+        filtered_json: dict,
+        combinations: dict,
+        sections: dict[tuple[str, str], tuple[int, tuple[int, ...]]] | None = None,
+        exams: dict[str, tuple[tuple[datetime, datetime] | None, ...]] | None = None,
+    ):
+        """
+        Args:
+            filtered_json (dict): filtered json file, i.e, with only courses selected
+            combinations (dict): possible section combinations of each course (see generate_intra_combinations)
+            sections (dict[tuple[str, str], tuple[int, tuple[int, ...]]], optional): precomputed (slot bitmask, daily loads) of (course, section), eg: from the compiled timetable. Sections not in it are computed from their schedule. Defaults to None.
+            exams (dict[str, tuple[tuple[datetime, datetime] | None, ...]], optional): precomputed (start, end) of the midsem and compre of each course (None if there is no such exam), eg: from the compiled timetable. Exams of courses not in it are parsed from their exams_iso. Defaults to None.
+        """
+        if sections is None:
+            sections = {}
+        if exams is None:
+            exams = {}
+        self.course_codes: list[str] = []
+        self.course_types: list[str] = []
+        self.course_exams: list[dict] = []
+        self.course_exam_slots: list[int] = []
+        self.course_exam_overlaps: list[int] = []
+        self.course_sections: list[list[int]] = []
+        self.course_combinations: list[list[int]] = []
+        self.section_courses: list[int] = []
+        self.section_names: list[str] = []
+        self.section_masks: list[int] = []
+        self.section_loads: list[tuple[int, ...]] = []
+        self.section_schedules: list[list[dict]] = []
+        self.combination_courses: list[int] = []
+        self.combination_options: list[tuple[str, tuple[str, ...]]] = []
+        self.combination_masks: list[int] = []
+        self.combination_loads: list[tuple[int, ...]] = []
+        self.valid_combinations: int = 0
+        self.compatible: list[int] = []
+        self.combination_id_dtype: np.dtype
+        self.combination_day_loads: np.ndarray
+        self.combination_day_hours: np.ndarray
+        self.combination_words: np.ndarray
+        self.combination_valid: np.ndarray
+        self.combination_course_ids: np.ndarray
+        self.course_exam_clashes: np.ndarray
+        self.exam_times: list[str] = []
+        self.exam_intervals: list[tuple[datetime, datetime]] = []
+        self.course_ids: dict[str, int] = {}
+        self.section_ids: dict[tuple[str, str], int] = {}
+
+        exam_ids: dict[str, int] = {}
+        for type in filtered_json:
+            for course, details in filtered_json[type].items():
+                course_id = len(self.course_codes)
+                self.course_ids[course] = course_id
+                self.course_codes.append(course)
+                self.course_types.append(type)
+
+                self.course_exams.append(details["exams"][0])
+                # exams are compared by their parsed times, the same exam time is the same exam slot
+                exams_iso = details.get("exams_iso") or [{}]
+                slots = 0
+                for i, exam in enumerate(("midsem", "compre")):
+                    time = exams_iso[0].get(exam)
+                    if time is None:
+                        continue
+                    if time not in exam_ids:
+                        exam_ids[time] = len(self.exam_times)
+                        self.exam_times.append(time)
+                        if course in exams:
+                            self.exam_intervals.append(exams[course][i])
+                        else:
+                            self.exam_intervals.append(parse_exam_interval(time))
+                    slots |= 1 << exam_ids[time]
+                self.course_exam_slots.append(slots)
+
+                self.course_sections.append([])
+                for sec, sec_details in details["sections"].items():
+                    section_id = len(self.section_names)
+                    self.section_ids[(course, sec)] = section_id
+                    self.course_sections[course_id].append(section_id)
+                    self.section_courses.append(course_id)
+                    self.section_names.append(sec)
+                    if (course, sec) in sections:
+                        mask, loads = sections[(course, sec)]
+                    else:
+                        mask = get_slot_mask(sec_details["schedule"])
+                        loads = get_day_loads(sec_details["schedule"])
+                    self.section_masks.append(mask)
+                    self.section_loads.append(loads)
+                    self.section_schedules.append(sec_details["schedule"])
+
+                self.course_combinations.append([])
+                for comb in combinations[type][course]:
+                    self._add_combination(course_id, comb)
+
+        self._compile_exam_overlaps()
+        self._compile_compatibility()
+        self._compile_arrays()
+
+    def _add_combination(self, course_id: int, comb: tuple[str, ...]) -> None:
+        """
+        Function to register a section combination of a course, and precompute its slot bitmask and daily loads
+
+        Args:
+            course_id (int): course id of the course
+            comb (tuple[str, ...]): section combination (one lecture, practical and tutorial section)
+        """
+        combination_id = len(self.combination_options)
+        option = (self.course_codes[course_id], comb)
+        self.course_combinations[course_id].append(combination_id)
+        self.combination_courses.append(course_id)
+        self.combination_options.append(option)
+
+        mask = 0
+        loads = [0] * len(DAYS)
+        clashes = False
+        for sec in comb:
+            section_id = self.section_ids[option[0], sec]
+            # sections of the same course can clash with each other as well (eg: L1 with its own P1)
+            if mask & self.section_masks[section_id]:
+                clashes = True
+            mask |= self.section_masks[section_id]
+            for i in range(len(DAYS)):
+                loads[i] += self.section_loads[section_id][i]
+        self.combination_masks.append(mask)
+        self.combination_loads.append(tuple(loads))
+        if not clashes:
+            self.valid_combinations |= 1 << combination_id
+
+    def _compile_exam_overlaps(self) -> None:
+        """
+        Function to precompute which exam slots overlap each other.
+        Exams in different slots can still overlap (eg: 2:00 - 3:30 and 3:00 - 4:30), so this is done on the exam intervals and not just the exam times.
+        """
+        # format: [bitset of the exam slots overlapping the slot, ...] for each exam slot (including itself)
+        overlaps = [0] * len(self.exam_intervals)
+        for a, (start_a, end_a) in enumerate(self.exam_intervals):
+            for b, (start_b, end_b) in enumerate(self.exam_intervals):
+                if start_a < end_b and start_b < end_a:
+                    overlaps[a] |= 1 << b
+        for slots in self.course_exam_slots:
+            course_overlaps = 0
+            for slot in range(len(overlaps)):
+                if slots >> slot & 1:
+                    course_overlaps |= overlaps[slot]
+            self.course_exam_overlaps.append(course_overlaps)
+
+    def _compile_compatibility(self) -> None:
+        """
+        Function to precompute the compatibility matrix of the section combinations.
+        Two combinations are compatible if they belong to different courses, neither clashes within itself, their classes do not share a slot and the courses do not have an exam at the same time.
+        Whether two combinations clash never depends on the rest of the timetable, so this is done once instead of for every timetable.
+        """
+        self.compatible = [0] * len(self.combination_options)
+        for course_a in range(len(self.course_codes)):
+            for course_b in range(course_a + 1, len(self.course_codes)):
+                # exam clashes are between courses, so they rule out every pair of combinations
+                if self.exams_clash(course_a, course_b):
+                    continue
+                for a in self.course_combinations[course_a]:
+                    if not self.valid_combinations >> a & 1:
+                        continue
+                    for b in self.course_combinations[course_b]:
+                        if not self.valid_combinations >> b & 1:
+                            continue
+                        if not self.combination_masks[a] & self.combination_masks[b]:
+                            self.compatible[a] |= 1 << b
+                            self.compatible[b] |= 1 << a
+
+    def _compile_arrays(self) -> None:
+        """
+        Function to precompute the per section combination arrays used to check clashes of a whole batch of timetables at once with NumPy
+        """
+        if len(self.combination_options) <= 2**16:
+            self.combination_id_dtype = np.dtype(np.uint16)
+        else:
+            self.combination_id_dtype = np.dtype(np.uint32)
+        self.combination_day_loads = np.array(
+            self.combination_loads, dtype=np.uint16
+        ).reshape(-1, len(DAYS))
+        self.combination_day_hours = np.array(
+            [
+                [mask >> (i * N_HOURS) & (2**N_HOURS - 1) for i in range(len(DAYS))]
+                for mask in self.combination_masks
+            ],
+            dtype=np.uint16,
+        ).reshape(-1, len(DAYS))
+        self.combination_words = np.array(
+            [
+                [mask >> (64 * w) & (2**64 - 1) for w in range(N_WORDS)]
+                for mask in self.combination_masks
+            ],
+            dtype=np.uint64,
+        ).reshape(-1, N_WORDS)
+        self.combination_valid = np.array(
+            [
+                bool(self.valid_combinations >> k & 1)
+                for k in range(len(self.combination_options))
+            ],
+            dtype=bool,
+        )
+        self.combination_course_ids = np.array(self.combination_courses, dtype=np.intp)
+        n_courses = len(self.course_codes)
+        self.course_exam_clashes = np.array(
+            [
+                [self.exams_clash(a, b) for b in range(n_courses)]
+                for a in range(n_courses)
+            ],
+            dtype=bool,
+        ).reshape(n_courses, n_courses)
+
+    def exams_clash(self, course_a: int, course_b: int) -> bool:
+        """
+        Function to check if an exam (midsem or compre) of one course overlaps an exam of the other
+
+        Args:
+            course_a (int): course id of the first course
+            course_b (int): course id of the second course
+
+        Returns:
+            bool: True if the exams clash, False otherwise
+        """
+        return bool(
+            self.course_exam_slots[course_a] & self.course_exam_overlaps[course_b]
+        )
@@ -1,7 +1,9 @@
 import pandas as pd
 import numpy as np
 import json
-from parse_times import parse_time, parse_compre_time
+import hashlib
+import os
+from parse_times import parse_times, parse_compre_times
 
 
 def isnan(value):
@@ -89,27 +91,18 @@ def null_empty_exams(course_json: dict) -> dict:
     return course_json
 
 
-def create_json_file(
-    timetable: pd.DataFrame,
-    columns: list[str],
-    output_file: str,
-    year: int,
-    academic_year: int,
-    semester: int,
-) -> None:
+def prepare_timetable(timetable: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
     """
-    Function to create a json file from a timetable dataframe.
+    Function to name the columns of a timetable dataframe and fill in the cells left empty for rows of the same course and section.
 
     Args:
-        timetable (pd.DataFrame): The timetable dataframe to create the json file from.
+        timetable (pd.DataFrame): The timetable dataframe (modified in place).
         columns (list[str]): The columns of the dataframe.
-        output_file (str): The name of the output json file.
-        year (int): The academic year of the timetable. (example: 2023)
-        academic_year (int): The academic year of the timetable. (example: 2021 is for acad year 2021-2022)
-        semester (int): The semester of the timetable. (example: 1 is for odd semester, 2 is for even semester)
+
+    Returns:
+        pd.DataFrame: The prepared timetable dataframe.
     """
     tt: pd.DataFrame = timetable
-    course_json: dict = {}
     tt.columns = columns
     tt.drop(columns=["serial"], inplace=True)
 
@@ -140,108 +133,113 @@ def create_json_file(
     #     if row["course_code"] == prev_row["course_code"] and row["course_name"].strip() != prev_row["course_name"].strip():
     #         print(prev_row["course_name"], row["course_name"])
     #     prev_row = row
-    
-    for _, row in tt.iterrows():
-        course_code = row["course_code"]
-
-        # initialize course and course details if not already initialized
-        if course_json.get(course_code) is None:
-            course_json[course_code] = {}
-            course_json[course_code]["units"] = row["U"]
-            course_json[course_code]["lecture units"] = row["L"]
-            course_json[course_code]["practical units"] = row["P"]
-        if course_json[course_code].get("course_name") is None:
-            course_json[course_code]["course_name"] = row["course_name"]
-        if course_json[course_code].get("sections") is None:
-            course_json[course_code]["sections"] = {}
-
-        # make sure sections of different kinds of classes (lecture, tutorial, practical) are not overwritten by each other
-        # to make sure of that, and for common lingo, we add a prefix to the section number
-
-        # section = int(row["section"])
-        # if row["course_name"] == "Tutorial":
-        #     section = "T" + str(section)
-        # elif (row["course_name"] == "Practical") or (
-        #     course_json[course_code]["lecture units"] == "-"
-        #     and course_json[course_code]["practical units"] != "-"
-        # ):
-        #     section = "P" + str(section)
-        # else:
-        #     section = "L" + str(section)
-
-        # New 2024-25 Draft timetable for sem 2 already has the above part formatted
-        section = row["section"]
-
-        # initialize section and section details if not already initialized
-        if course_json[course_code]["sections"].get(section) is None:
-            course_json[course_code]["sections"][section] = {}
-
-        if course_json[course_code]["sections"][section].get("instructor") is None:
-            course_json[course_code]["sections"][section]["instructor"] = set()
-
-        # add instructor to the set of instructors for the section
-        course_json[course_code]["sections"][section]["instructor"].add(
-            row["instructor"]
-        )
 
-        # initialize schedule if not already initialized
-        if course_json[course_code]["sections"][section].get("schedule") is None:
-            course_json[course_code]["sections"][section]["schedule"] = []
-
-        # add schedule to the list of schedules for the section
-        # list of schedules is a list of dictionaries, where each dictionary is a schedule
-        # we kept it as a list, as a class may have multiple schedules (eg: "T Th @ 4" and "S @ 2")
-        dictionary = {}
-        if not isnan(row["room"]):
-            dictionary["room"] = row["room"]
-        else:
-            dictionary["room"] = np.nan
-
-        if not isnan(row["days"]):
-            dictionary["days"] = tuple(row["days"].split())
-        else:
-            dictionary["days"] = np.nan
-
-        if not isnan(row["hours"]):
-            dictionary["hours"] = tuple([int(x) for x in list(row["hours"].split())])
-        else:
-            dictionary["hours"] = np.nan
-
-        if not (
-            isnan(dictionary["room"])
-            and isnan(dictionary["days"])
-            and isnan(dictionary["hours"])
-        ):
-            course_json[course_code]["sections"][section]["schedule"].append(dictionary)
-
-        # remove duplicate schedules
-        course_json[course_code]["sections"][section][
-            "schedule"
-        ] = remove_duplicate_dicts(
-            course_json[course_code]["sections"][section]["schedule"]
-        )
+    return tt
+
 
-        # initialize exams if not already initialized
-        if course_json[course_code].get("exams") is None:
-            course_json[course_code]["exams"] = []
+def build_course_json(tt: pd.DataFrame, year: int) -> dict:
+    """
+    Function to build the json of the courses in a prepared timetable dataframe (see prepare_timetable).
 
-        exam_dict = {}
-        # add exams to the list of exams for the course
-        if not isnan(row["midsem"]):
-            exam_dict["midsem"] = row["midsem"]
+    Args:
+        tt (pd.DataFrame): The prepared timetable dataframe.
+        year (int): The academic year of the timetable. (example: 2023)
 
-        if not isnan(row["compre"]):
-            exam_dict["compre"] = row["compre"]
+    Returns:
+        dict: The json of each course, in the order they first appear.
+    """
+    course_json: dict = {}
 
-        if exam_dict:
-            course_json[course_code]["exams"].append(exam_dict)
+    # same values iterrows would give, but without building a Series for every row
+    rows = tt.values
+    col = {name: i for i, name in enumerate(tt.columns)}
+    # empty cells of the columns that are optional in a row, checked for the whole column at once
+    empty = {
+        name: tt[name].isna().to_numpy()
+        for name in ["room", "days", "hours", "midsem", "compre"]
+    }
 
-        # remove duplicate exams
+    # rows of each course, courses in the order they first appear
+    course_rows = tt.groupby("course_code", sort=False, dropna=False).indices
+    for course_code, positions in sorted(
+        course_rows.items(), key=lambda item: item[1][0]
+    ):
+        first = rows[positions[0]]
+        course_json[course_code] = {}
+        course_json[course_code]["units"] = first[col["U"]]
+        course_json[course_code]["lecture units"] = first[col["L"]]
+        course_json[course_code]["practical units"] = first[col["P"]]
+        course_json[course_code]["course_name"] = first[col["course_name"]]
+        course_json[course_code]["sections"] = {}
+        course_json[course_code]["exams"] = []
+
+        for i in positions:
+            row = rows[i]
+
+            # make sure sections of different kinds of classes (lecture, tutorial, practical) are not overwritten by each other
+            # to make sure of that, and for common lingo, we add a prefix to the section number
+
+            # section = int(row["section"])
+            # if row["course_name"] == "Tutorial":
+            #     section = "T" + str(section)
+            # elif (row["course_name"] == "Practical") or (
+            #     course_json[course_code]["lecture units"] == "-"
+            #     and course_json[course_code]["practical units"] != "-"
+            # ):
+            #     section = "P" + str(section)
+            # else:
+            #     section = "L" + str(section)
+
+            # New 2024-25 Draft timetable for sem 2 already has the above part formatted
+            section = row[col["section"]]
+
+            # initialize section and section details if not already initialized
+            sections = course_json[course_code]["sections"]
+            if sections.get(section) is None:
+                sections[section] = {"instructor": set(), "schedule": []}
+
+            # add instructor to the set of instructors for the section
+            sections[section]["instructor"].add(row[col["instructor"]])
+
+            # add schedule to the list of schedules for the section
+            # list of schedules is a list of dictionaries, where each dictionary is a schedule
+            # we kept it as a list, as a class may have multiple schedules (eg: "T Th @ 4" and "S @ 2")
+            if not (empty["room"][i] and empty["days"][i] and empty["hours"][i]):
+                dictionary = {}
+                dictionary["room"] = np.nan if empty["room"][i] else row[col["room"]]
+                if empty["days"][i]:
+                    dictionary["days"] = np.nan
+                else:
+                    dictionary["days"] = tuple(row[col["days"]].split())
+                if empty["hours"][i]:
+                    dictionary["hours"] = np.nan
+                else:
+                    dictionary["hours"] = tuple(
+                        [int(x) for x in list(row[col["hours"]].split())]
+                    )
+                sections[section]["schedule"].append(dictionary)
+
+            # add exams to the list of exams for the course
+            exam_dict = {}
+            if not empty["midsem"][i]:
+                exam_dict["midsem"] = row[col["midsem"]]
+            if not empty["compre"][i]:
+                exam_dict["compre"] = row[col["compre"]]
+            if exam_dict:
+                course_json[course_code]["exams"].append(exam_dict)
+
+        # remove duplicate schedules and exams, once for the whole course
+        for section in course_json[course_code]["sections"].values():
+            section["schedule"] = remove_duplicate_dicts(section["schedule"])
         course_json[course_code]["exams"] = remove_duplicate_dicts(
             course_json[course_code]["exams"]
         )
 
-    # parse exam times
+    # parse exam times, every distinct time in the midsem and compre columns only once
+    midsems = [time for time in tt["midsem"][~empty["midsem"]].unique() if time]
+    compres = [time for time in tt["compre"][~empty["compre"]].unique() if time]
+    midsems_iso = dict(zip(midsems, parse_times(midsems, year)))
+    compres_iso = dict(zip(compres, parse_compre_times(compres, year)))
     for course_code in course_json:
         # remove lecture units, practical units
         del course_json[course_code]["lecture units"]
@@ -252,10 +250,10 @@ def create_json_file(
             exam_iso = {}
 
             if exam.get("midsem"):
-                exam_iso["midsem"] = parse_time(exam["midsem"], year)
+                exam_iso["midsem"] = midsems_iso[exam["midsem"]]
 
             if exam.get("compre"):
-                exam_iso["compre"] = parse_compre_time(exam["compre"], year)
+                exam_iso["compre"] = compres_iso[exam["compre"]]
 
             if exam_iso:
                 exams_iso.append(exam_iso)
@@ -264,6 +262,30 @@ def create_json_file(
 
     # convert file to serializable format
     convert_all_sets_to_list_recursive(course_json)
+    return course_json
+
+
+def create_json_file(
+    timetable: pd.DataFrame,
+    columns: list[str],
+    output_file: str,
+    year: int,
+    academic_year: int,
+    semester: int,
+) -> None:
+    """
+    Function to create a json file from a timetable dataframe.
+
+    Args:
+        timetable (pd.DataFrame): The timetable dataframe to create the json file from.
+        columns (list[str]): The columns of the dataframe.
+        output_file (str): The name of the output json file.
+        year (int): The academic year of the timetable. (example: 2023)
+        academic_year (int): The academic year of the timetable. (example: 2021 is for acad year 2021-2022)
+        semester (int): The semester of the timetable. (example: 1 is for odd semester, 2 is for even semester)
+    """
+    tt = prepare_timetable(timetable, columns)
+    course_json = build_course_json(tt, year)
     final_json = {}
     final_json["metadata"] = {
         "acadYear": academic_year,
@@ -277,6 +299,99 @@ def create_json_file(
     json.dump(final_json, open(output_file, "w"), indent=4)
 
 
+def get_course_hashes(tt: pd.DataFrame) -> dict:
+    """
+    Function to hash the rows of each course in a prepared timetable dataframe (see prepare_timetable). A course has to be rebuilt only if its hash changes.
+
+    Args:
+        tt (pd.DataFrame): The prepared timetable dataframe.
+
+    Returns:
+        dict: The hash of each course, in the order they first appear.
+    """
+    row_hashes = pd.util.hash_pandas_object(tt, index=False).to_numpy()
+    course_rows = tt.groupby("course_code", sort=False, dropna=False).indices
+    return {
+        course_code: hashlib.sha256(row_hashes[positions].tobytes()).hexdigest()
+        for course_code, positions in sorted(
+            course_rows.items(), key=lambda item: item[1][0]
+        )
+    }
+
+
+def update_json_file(
+    timetable: pd.DataFrame,
+    columns: list[str],
+    output_file: str,
+    hash_file: str,
+    year: int,
+    academic_year: int,
+    semester: int,
+) -> dict[str, list[str]]:
+    """
+    Function to update a json file created before from a revised timetable dataframe, rebuilding only the courses whose rows changed.
+    The hash of the rows of each course is saved in the hash file, and the json of a course whose hash did not change is taken from the existing json file. If either file is missing (or the year changed), every course is rebuilt.
+
+    Args:
+        timetable (pd.DataFrame): The timetable dataframe to create the json file from.
+        columns (list[str]): The columns of the dataframe.
+        output_file (str): The name of the output json file (updated in place).
+        hash_file (str): The name of the json file the hashes of the courses are saved in.
+        year (int): The academic year of the timetable. (example: 2023)
+        academic_year (int): The academic year of the timetable. (example: 2021 is for acad year 2021-2022)
+        semester (int): The semester of the timetable. (example: 1 is for odd semester, 2 is for even semester)
+
+    Returns:
+        dict[str, list[str]]: The courses that were added, removed and modified.
+    """
+    tt = prepare_timetable(timetable, columns)
+    hashes = get_course_hashes(tt)
+
+    old_hashes = {}
+    old_courses = {}
+    if os.path.exists(hash_file) and os.path.exists(output_file):
+        with open(hash_file, "r") as f:
+            saved = json.load(f)
+        if saved["year"] == year:
+            old_hashes = saved["courses"]
+            with open(output_file, "r") as f:
+                old_courses = json.load(f)["courses"]
+
+    changes = {
+        "added": [code for code in hashes if code not in old_hashes],
+        "removed": [code for code in old_hashes if code not in hashes],
+        "modified": [
+            code
+            for code in hashes
+            if code in old_hashes and hashes[code] != old_hashes[code]
+        ],
+    }
+    # courses that are not in the existing json file for some reason are rebuilt too
+    rebuild = {
+        code
+        for code in hashes
+        if old_hashes.get(code) != hashes[code] or code not in old_courses
+    }
+    rebuilt = build_course_json(tt[tt["course_code"].isin(rebuild)], year)
+
+    course_json = {}
+    for code in hashes:
+        course_json[code] = rebuilt[code] if code in rebuild else old_courses[code]
+    final_json = {}
+    final_json["metadata"] = {
+        "acadYear": academic_year,
+        "semester": semester,
+    }
+    final_json["courses"] = course_json
+
+    final_json = null_empty_exams(final_json)
+
+    # output the json file
+    json.dump(final_json, open(output_file, "w"), indent=4)
+    json.dump({"year": year, "courses": hashes}, open(hash_file, "w"), indent=4)
+    return changes
+
+
 if __name__ == "__main__":
     # reorder the columns as and when needed
     columns = [
@@ -296,5 +411,21 @@ if __name__ == "__main__":
     ]
 
     timetable = pd.read_csv("./files/output.csv")
-    
-    create_json_file(timetable, columns, "./files/timetable.json", 2024, 2024, 1)
+
+    # rebuild only the courses that changed since the last time (creates the file from scratch the first time)
+    incremental = True
+
+    if incremental:
+        changes = update_json_file(
+            timetable,
+            columns,
+            "./files/timetable.json",
+            "./files/course_hashes.json",
+            2024,
+            2024,
+            1,
+        )
+        for change, courses in changes.items():
+            print(f"Courses {change}:", courses)
+    else:
+        create_json_file(timetable, columns, "./files/timetable.json", 2024, 2024, 1)
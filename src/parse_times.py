@@ -1,9 +1,16 @@
-import pandas as pd
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterable
 
+# timetable times are in IST, the ISO times are in UTC
+IST_OFFSET = timedelta(hours=5, minutes=30)
 
+
+@lru_cache(maxsize=None)
 def parse_time(time: str, year: int, midsem=True) -> str:
     """
     Function to parse the time from the string given by ttd, to ISO format for easier consumption in the web site.
+    Results are cached, as most courses share the same few exam times.
 
     Args:
         time (str): The string given by ttd for the time. (Format: "13/03 11.30 - 1.00PM")
@@ -24,7 +31,8 @@ def parse_time(time: str, year: int, midsem=True) -> str:
 
     date_in_year = parts[0].split("/")
 
-    date = date_in_year[0] + "-" + date_in_year[1] + "-" + str(year)
+    day = int(date_in_year[0])
+    month = int(date_in_year[1])
 
     start = parts[1].split(".")
     end = parts[3].split(".")
@@ -49,54 +57,38 @@ def parse_time(time: str, year: int, midsem=True) -> str:
     # assumption is exam doesn't last longer than 12 hours (sane)
     # so if end time is PM and start_pm is less than end, then start_pm is correct start
     # otherwise start/start_am is correct start
-    start_date_am = date + "T" + start[0] + ":" + start[1] + ":00"
-    start_date_pm = date + "T" + start_pm[0] + ":" + start_pm[1] + ":00"
-    end_date = date + "T" + end[0] + ":" + end[1] + ":00"
-
-    end_date = pd.to_datetime(end_date, dayfirst=True).isoformat()
-    start_date_am = pd.to_datetime(start_date_am, dayfirst=True).isoformat()
-    start_date_pm = pd.to_datetime(start_date_pm, dayfirst=True).isoformat()
+    start_date_am = datetime(year, month, day, int(start[0]), int(start[1]))
+    start_date_pm = datetime(year, month, day, int(start_pm[0]), int(start_pm[1]))
+    end_date = datetime(year, month, day, int(end[0]), int(end[1]))
 
     # print(start_date_am, start_date_pm, end_date)
 
-    if end_time == "PM":
-        if pd.Timestamp(start_date_pm) > pd.Timestamp(end_date):
-            start_date_am = pd.Timestamp(start_date_am)
-            return (
-                (
-                    pd.Timestamp(start_date_am) - pd.Timedelta(hours=5, minutes=30)
-                ).isoformat()
-                + "|"
-                + (
-                    pd.Timestamp(end_date) - pd.Timedelta(hours=5, minutes=30)
-                ).isoformat()
-            )
-
-        else:
-            start_date_pm = pd.Timestamp(start_date_pm)
-            return (
-                str(
-                    (
-                        pd.Timestamp(start_date_pm) - pd.Timedelta(hours=5, minutes=30)
-                    ).isoformat()
-                )
-                + "|"
-                + (
-                    pd.Timestamp(end_date) - pd.Timedelta(hours=5, minutes=30)
-                ).isoformat()
-            )
-
+    if end_time == "PM" and not start_date_pm > end_date:
+        start_date = start_date_pm
     else:
-        start_date_am = pd.Timestamp(start_date_am)
-        return (
-            (
-                pd.Timestamp(start_date_am) - pd.Timedelta(hours=5, minutes=30)
-            ).isoformat()
-            + "|"
-            + (pd.Timestamp(end_date) - pd.Timedelta(hours=5, minutes=30)).isoformat()
-        )
+        start_date = start_date_am
+    return (
+        (start_date - IST_OFFSET).isoformat()
+        + "|"
+        + (end_date - IST_OFFSET).isoformat()
+    )
+
+
+def parse_times(times: Iterable[str], year: int, midsem=True) -> list[str]:
+    """
+    Function to parse a whole column of times given by ttd (see parse_time). Repeated times are only parsed once.
+
+    Args:
+        times (Iterable[str]): The strings given by ttd for the times. (Format: "13/03 11.30 - 1.00PM")
+        year (int): The year of the timetable. (example: 2023)
+
+    Returns:
+        list[str]: The times in ISO format, in the same order.
+    """
+    return [parse_time(time, year, midsem) for time in times]
 
 
+@lru_cache(maxsize=None)
 def parse_compre_time(compre_time: str, year: int):
     """
     Function to parse the compre time from the string given by ttd, to ISO format for easier consumption in the web site.
@@ -114,6 +106,20 @@ def parse_compre_time(compre_time: str, year: int):
     return parse_time(time, year, False)
 
 
+def parse_compre_times(compre_times: Iterable[str], year: int) -> list[str]:
+    """
+    Function to parse a whole column of compre times given by ttd (see parse_compre_time). Repeated times are only parsed once.
+
+    Args:
+        compre_times (Iterable[str]): The strings given by ttd for the compre times. (Format: "19/05 FN")
+        year (int): The year of the timetable. (example: 2023)
+
+    Returns:
+        list[str]: The compre times in ISO format, in the same order.
+    """
+    return [parse_compre_time(compre_time, year) for compre_time in compre_times]
+
+
 if __name__ == "__main__":
     print(parse_time("14/10 - 4.00 - 5.30PM", 2023))
     print(parse_compre_time("21/12 AN", 2023))
@@ -0,0 +1,169 @@
+import json
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from course_index import DAYS, CourseIndex
+
+# number of timetables converted at a time, when writing and reading the store (and iterating over arrays of timetables, see iter_timetables)
+CHUNK_SIZE = 65536
+
+
+def get_result_store_size(
+    n_timetables: int, n_courses: int, index: CourseIndex, scored: bool = False
+) -> int:
+    """
+    Function to get how big a result store would be on disk (see write_result_store), eg: to know if it is worth writing before generating the timetables.
+
+    Args:
+        n_timetables (int): number of timetables
+        n_courses (int): number of courses in each timetable
+        index (CourseIndex): compiled index of the selected courses
+        scored (bool, optional): whether the timetables are scored. Defaults to False.
+
+    Returns:
+        int: size of the rows and the daily loads and hours, in bytes (the metadata is left out)
+    """
+    width = n_courses + (1 + len(DAYS) if scored else 0)
+    row_size = width * index.combination_id_dtype.itemsize
+    days_size = 2 * len(DAYS) * np.dtype(np.uint16).itemsize
+    return n_timetables * (row_size + days_size)
+
+
+def write_result_store(
+    path: str, timetables: Iterable, index: CourseIndex, scored: bool = False
+) -> int:
+    """
+    Function to write timetables to a result store on disk, which can be read back lazily with ResultStore.
+    Each timetable is written as a fixed width row of the ids of its section combinations (see CourseIndex), a few bytes per course, so results that do not fit in memory can still be kept.
+    Timetables are consumed one at a time and written in chunks, so it can be fed a lazy pipeline (see generate_timetables_without_clashes or stream_timetables).
+        <path>.bin: the rows, one after the other
+        <path>.days.bin: the number of classes on each day (7) and the bitmask of the hours with a class on each day (7) of each timetable, as uint16, so timetables can be ranked again without going through them (see rank_timetables)
+        <path>.json: the number of rows, their width and type, and the courses of the index they were written with
+
+    Args:
+        path (str): The path to write the store to (without extension).
+        timetables (Iterable): timetables, or (free days matched, daily scores, timetable) if scored
+        index (CourseIndex): compiled index of the selected courses
+        scored (bool, optional): whether the timetables are scored (eg: from day_wise_filter), in which case the free days matched and the daily scores are written at the start of each row. Defaults to False.
+
+    Returns:
+        int: number of timetables written
+    """
+    dtype = index.combination_id_dtype
+    # columns before the section combination ids
+    n_scores = 1 + len(DAYS) if scored else 0
+    width = None
+    n_rows = 0
+
+    def write_chunk(chunk: list[list[int]]) -> None:
+        rows = np.array(chunk, dtype=dtype).reshape(len(chunk), width)
+        rows.tofile(f)
+        combinations = rows[:, n_scores:]
+        loads = index.combination_day_loads[combinations].sum(axis=1, dtype=np.uint16)
+        hours = np.bitwise_or.reduce(index.combination_day_hours[combinations], axis=1)
+        np.concatenate([loads, hours], axis=1).astype(np.uint16).tofile(days_f)
+
+    with open(path + ".bin", "wb") as f, open(path + ".days.bin", "wb") as days_f:
+        chunk = []
+        for timetable in timetables:
+            if scored:
+                n_free, daily_scores, timetable = timetable
+                row = [n_free, *daily_scores]
+            else:
+                row = []
+            row.extend(timetable)
+            if width is None:
+                width = len(row)
+            elif len(row) != width:
+                raise Exception(
+                    "Timetables in a result store need the same number of courses"
+                )
+            chunk.append(row)
+            if len(chunk) == CHUNK_SIZE:
+                write_chunk(chunk)
+                n_rows += len(chunk)
+                chunk = []
+        if chunk:
+            write_chunk(chunk)
+            n_rows += len(chunk)
+
+    metadata = {
+        "n_rows": n_rows,
+        "width": width or 0,
+        "dtype": dtype.name,
+        "scored": scored,
+        "courses": index.course_codes,
+    }
+    with open(path + ".json", "w") as f:
+        json.dump(metadata, f, indent=4)
+    return n_rows
+
+
+class ResultStore:
+    """
+    Timetables written by write_result_store, memory mapped, so only the rows being read are loaded from disk.
+    It can be iterated over (or indexed) like the list of timetables it was written from, and passed as such to day_wise_filter, export_to_json, etc.
+
+    Attributes:
+        index (CourseIndex): compiled index of the selected courses
+        rows (np.ndarray): the rows of the store (memory mapped), one per timetable, as the section combination ids of its courses (after the free days matched and the daily scores if scored)
+        scored (bool): whether the timetables are scored
+        loads (np.ndarray): number of classes on each day of each timetable (memory mapped), shape (number of timetables, 7)
+        day_hours (np.ndarray): bitmask of the hours with a class on each day of each timetable (memory mapped), shape (number of timetables, 7)
+    """
+
+    def __init__(self, path: str, index: CourseIndex):
+        """
+        Args:
+            path (str): The path the store was written to (without extension).
+            index (CourseIndex): compiled index of the selected courses, the same ones the store was written with
+        """
+        with open(path + ".json", "r") as f:
+            metadata = json.load(f)
+        if metadata["courses"] != index.course_codes:
+            raise Exception("Result store was written with different courses")
+        self.index = index
+        self.scored: bool = metadata["scored"]
+        shape = (metadata["n_rows"], metadata["width"])
+        days_shape = (metadata["n_rows"], 2 * len(DAYS))
+        if shape[0] * shape[1] == 0:
+            # empty files cannot be memory mapped
+            self.rows: np.ndarray = np.empty(shape, dtype=metadata["dtype"])
+            days = np.zeros(days_shape, dtype=np.uint16)
+        else:
+            self.rows: np.ndarray = np.memmap(
+                path + ".bin", dtype=metadata["dtype"], mode="r", shape=shape
+            )
+            days = np.memmap(
+                path + ".days.bin", dtype=np.uint16, mode="r", shape=days_shape
+            )
+        self.loads: np.ndarray = days[:, : len(DAYS)]
+        self.day_hours: np.ndarray = days[:, len(DAYS) :]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, i: int) -> tuple:
+        return self._convert(self.rows[i].tolist())
+
+    def __iter__(self) -> Iterator[tuple]:
+        for start in range(0, len(self.rows), CHUNK_SIZE):
+            # a chunk at a time, so the memory used stays the same however big the store is
+            for row in self.rows[start : start + CHUNK_SIZE].tolist():
+                yield self._convert(row)
+
+    def _convert(self, row: list[int]) -> tuple:
+        """
+        Function to convert a row back to the timetable it was written from
+
+        Args:
+            row (list[int]): row of the store
+
+        Returns:
+            tuple: timetable, or (free days matched, daily scores, timetable) if scored
+        """
+        if not self.scored:
+            return tuple(row)
+        n_days = len(DAYS)
+        return (row[0], row[1 : n_days + 1], tuple(row[n_days + 1 :]))
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+from typing import Iterable
+
+from course_index import CourseIndex
+from result_store import ResultStore, write_result_store
+
+# size the cache is kept under by default, in bytes (1 GiB)
+CACHE_SIZE = 2**30
+
+
+def get_cache_key(filtered_json: dict, n_dels: int, n_opels: int, n_huels: int) -> str:
+    """
+    Function to get the key the timetables without clashes are cached by. They only depend on the selected courses (their sections and exams) and how many of the electives are taken, not on the free days or the lite order.
+    The courses are hashed in the order they are in, as the section combination ids the timetables are cached as depend on it.
+
+    Args:
+        filtered_json (dict): filtered json file, i.e, with only courses selected
+        n_dels (int): number of DELs selected
+        n_opels (int): number of OPELs selected
+        n_huels (int): number of HUELs selected
+
+    Returns:
+        str: the key (a hash of all of the above)
+    """
+    key = json.dumps([filtered_json, n_dels, n_opels, n_huels], separators=(",", ":"))
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def load_cached_timetables(
+    cache_dir: str, key: str, index: CourseIndex
+) -> ResultStore | None:
+    """
+    Function to load the cached timetables without clashes for a key, and mark them as just used (for the eviction, see evict_cached_timetables).
+
+    Args:
+        cache_dir (str): The directory the cache is kept in.
+        key (str): The key of the timetables (see get_cache_key).
+        index (CourseIndex): compiled index of the selected courses
+
+    Returns:
+        ResultStore | None: the cached timetables, or None if they are not in the cache
+    """
+    path = os.path.join(cache_dir, key)
+    try:
+        timetables = ResultStore(path, index)
+    except (OSError, ValueError):
+        # missing, or not written completely (eg: files of different sizes)
+        return None
+    # the modification time is when it was last used
+    os.utime(path + ".json")
+    return timetables
+
+
+def save_cached_timetables(
+    cache_dir: str,
+    key: str,
+    timetables: Iterable,
+    index: CourseIndex,
+    max_size: int = CACHE_SIZE,
+) -> ResultStore:
+    """
+    Function to write timetables without clashes to the cache (as a result store, see write_result_store), and evict the least recently used ones if the cache gets too big.
+
+    Args:
+        cache_dir (str): The directory the cache is kept in (created if it does not exist).
+        key (str): The key of the timetables (see get_cache_key).
+        timetables (Iterable): timetables without clashes, eg: from generate_timetables_without_clashes
+        index (CourseIndex): compiled index of the selected courses
+        max_size (int, optional): size the cache is kept under, in bytes. Defaults to 1 GiB.
+
+    Returns:
+        ResultStore: the cached timetables
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key)
+    # the metadata is removed first and written last, so timetables that were not written completely are never loaded, even over an older entry with the same key
+    if os.path.exists(path + ".json"):
+        os.remove(path + ".json")
+    write_result_store(path, timetables, index)
+    evict_cached_timetables(cache_dir, max_size, keep=key)
+    return ResultStore(path, index)
+
+
+def evict_cached_timetables(cache_dir: str, max_size: int, keep: str = None) -> None:
+    """
+    Function to delete the least recently used timetables from the cache, until it is no bigger than max_size.
+
+    Args:
+        cache_dir (str): The directory the cache is kept in.
+        max_size (int): size the cache is kept under, in bytes.
+        keep (str, optional): key of timetables to never delete (eg: the ones in use), even if they alone are bigger than max_size. Defaults to None.
+    """
+    # format: {key: [last used, size]}
+    entries: dict[str, list] = {}
+    # format: {key: [names of its files]}
+    files: dict[str, list] = {}
+    for name in os.listdir(cache_dir):
+        # eg: <key>.bin, <key>.days.bin, <key>.json
+        key, extension = name.split(".", 1)[0], os.path.splitext(name)[1]
+        if extension not in (".bin", ".json"):
+            continue
+        stat = os.stat(os.path.join(cache_dir, name))
+        entry = entries.setdefault(key, [0, 0])
+        entry[1] += stat.st_size
+        if name == key + ".json":
+            entry[0] = stat.st_mtime_ns
+        files.setdefault(key, []).append(name)
+
+    total = sum(size for _, size in entries.values())
+    # timetables that were not written completely (no metadata) are the first to go
+    for key, (_, size) in sorted(entries.items(), key=lambda entry: entry[1][0]):
+        if total <= max_size:
+            break
+        if key == keep:
+            continue
+        for name in files[key]:
+            os.remove(os.path.join(cache_dir, name))
+        total -= size
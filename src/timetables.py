@@ -1,7 +1,29 @@
+import bisect
+import heapq
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from itertools import product, combinations
 from operator import itemgetter
-from typing import Annotated
+from typing import Annotated, Callable, Iterable, Iterator
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    # optional, only makes compact exports faster
+    orjson = None
+
+from compile_timetable import compile_timetable, is_compiled, load_compiled_timetable
+from course_index import DAYS, DAY_MASKS, CourseIndex
+from result_store import CHUNK_SIZE, ResultStore, get_result_store_size
+from results_cache import (
+    CACHE_SIZE,
+    get_cache_key,
+    load_cached_timetables,
+    save_cached_timetables,
+)
 
 
 def get_filtered_json(
@@ -40,7 +62,7 @@ def get_filtered_json(
 def separate_sections_into_types(
     filtered_json: Annotated[
         dict, "filtered json file, i.e, with only courses selected"
-    ]
+    ],
 ) -> dict:
     """
     Function to separate the sections into lectures, tutorials and practicals
@@ -120,43 +142,70 @@ def generate_intra_combinations(
     return combs
 
 
-def generate_exhaustive_timetables(
+def compile_course_index(
     filtered_json: Annotated[
         dict, "filtered json file, i.e, with only courses selected"
     ],
+    sections: Annotated[
+        dict | None, "precomputed (slot bitmask, daily loads) of (course, section)"
+    ] = None,
+    exams: Annotated[
+        dict | None, "precomputed (start, end) of the midsem and compre of each course"
+    ] = None,
+) -> CourseIndex:
+    """
+    Function that compiles the filtered json file into a CourseIndex, which is what the rest of the pipeline works with
+
+    Args:
+        filtered_json (dict): filtered json file, i.e, with only courses selected
+        sections (dict, optional): precomputed (slot bitmask, daily loads) of (course, section), eg: from load_compiled_timetable. Defaults to None.
+        exams (dict, optional): precomputed (start, end) of the midsem and compre of each course, eg: from load_compiled_timetable. Defaults to None.
+
+    Returns:
+        CourseIndex: compiled index of the selected courses
+    """
+    return CourseIndex(
+        filtered_json, generate_intra_combinations(filtered_json), sections, exams
+    )
+
+
+def get_course_options(
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
     n_dels: Annotated[int, "number of DELs selected"],
     n_opels: Annotated[int, "number of OPELs selected"],
     n_huels: Annotated[int, "number of HUELs selected"],
 ) -> list:
     """
-    Function that generates all possible timetables (exhaustive and inclusive of clashes)
+    Function that lists, for every possible choice of electives, the section combinations available for each course
 
     Args:
-        filtered_json (dict): filtered json file, i.e, with only courses selected
+        index (CourseIndex): compiled index of the selected courses
+        n_dels (int): number of DELs selected
+        n_opels (int): number of OPELs selected
+        n_huels (int): number of HUELs selected
 
     Returns:
-        list: list of all possible timetables (exhaustive and inclusive of clashes)
+        list: one entry per choice of electives, each being a list (one per course) of the ids of its section combinations
     """
 
-    combs = generate_intra_combinations(filtered_json)
-    timetables = []
     cdcs = []
     dels = []
     opels = []
     huels = []
-    for type in combs:
-        for course in combs[type]:
-            # format (course, section combination for that course)
-            if type == "CDCs":
-                cdcs.append([(str(course), comb) for comb in combs[type][course]])
-            elif type == "DEls":
-                dels.append([(str(course), comb) for comb in combs[type][course]])
-            elif type == "OPELs":
-                opels.append([(str(course), comb) for comb in combs[type][course]])
-            elif type == "HUELs":
-                huels.append([(str(course), comb) for comb in combs[type][course]])
-            else:
-                raise Exception("Course type not found in any category")
+    for course_id in range(len(index.course_codes)):
+        type = index.course_types[course_id]
+        # ids of the section combinations for that course
+        options = index.course_combinations[course_id]
+        if type == "CDCs":
+            cdcs.append(options)
+        elif type == "DEls":
+            dels.append(options)
+        elif type == "OPELs":
+            opels.append(options)
+        elif type == "HUELs":
+            huels.append(options)
+        else:
+            raise Exception("Course type not found in any category")
 
     # choose n_dels from dels
     if dels:
@@ -186,146 +235,496 @@ def generate_exhaustive_timetables(
         poss.extend([[c] for c in comb])
         courses.append(poss)
 
-    timetables = list(product(*courses))
-    timetables = []
-    for i in range(len(courses)):
-        timetables.extend(list(product(*courses[i])))
-    return timetables
+    return courses
 
-    # timetables = list(product(cdcs, dels, huels, opels))
-    # return timetables
 
+def iter_exhaustive_timetables(
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+    n_dels: Annotated[int, "number of DELs selected"],
+    n_opels: Annotated[int, "number of OPELs selected"],
+    n_huels: Annotated[int, "number of HUELs selected"],
+) -> Iterator[tuple]:
+    """
+    Function that lazily generates all possible timetables (exhaustive and inclusive of clashes), one at a time.
+    Timetables are tuples of the ids of their section combinations (one per course, see CourseIndex), which every stage up to day_wise_filter works with, so no course codes or sections are copied or looked up while checking them. They are only converted back to course codes and sections on export (see get_timetable_codes).
+    Many timetables can also be kept as the rows of an array of those ids (see generate_exhaustive_array), a few bytes per course.
 
-def remove_clashes(
-    timetables: Annotated[list, "exhaustive list of all possible timetables"],
-    json: Annotated[dict, "filtered json file"],
+    Args:
+        index (CourseIndex): compiled index of the selected courses
+        n_dels (int): number of DELs selected
+        n_opels (int): number of OPELs selected
+        n_huels (int): number of HUELs selected
+
+    Yields:
+        tuple: possible timetable (inclusive of clashes), as section combination ids
+    """
+    for courses in get_course_options(index, n_dels, n_opels, n_huels):
+        for timetable in product(*courses):
+            yield timetable
+
+
+def generate_exhaustive_timetables(
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+    n_dels: Annotated[int, "number of DELs selected"],
+    n_opels: Annotated[int, "number of OPELs selected"],
+    n_huels: Annotated[int, "number of HUELs selected"],
 ) -> list:
     """
-    Function that filters out timetables with clashes
+    Function that generates all possible timetables (exhaustive and inclusive of clashes)
 
     Args:
-        timetables (list): exhaustive list of all possible timetables
-        json (dict): filtered json file
+        index (CourseIndex): compiled index of the selected courses
 
     Returns:
-        list: list of timetables without clashes
+        list: list of all possible timetables (exhaustive and inclusive of clashes)
     """
-    filtered = []
-    for timetable in timetables:
-        # times currently held as "in use" by some course's section
-        # format "DH" where D is the day and H is the hour
-        times: dict[str, bool] = dict()
-        clashes = False
-        for course in timetable:
-            # course[1] as that has the section details, course[0] hold course code
-            for sec in course[1]:
-                # the schedule of the section from the main json file
-                if course[0] in json["CDCs"]:
-                    sched = json["CDCs"][course[0]]["sections"][sec]["schedule"]
-                elif course[0] in json["DEls"]:
-                    sched = json["DEls"][course[0]]["sections"][sec]["schedule"]
-                elif course[0] in json["HUELs"]:
-                    sched = json["HUELs"][course[0]]["sections"][sec]["schedule"]
-                elif course[0] in json["OPELs"]:
-                    sched = json["OPELs"][course[0]]["sections"][sec]["schedule"]
-                else:
-                    raise Exception("Course code not found in any category")
-                # ts denotes all slots needed for the section
-                ts = []
-                for i in range(len(sched)):
-                    ts.extend(list(product(sched[i]["days"], sched[i]["hours"])))
-                # converting it to the string of required format "DH"
-                ts = [str(t[0]) + str(t[1]) for t in ts]
-                # if any slot in ts is already in times, then there is a clash
-                # if so, mark it as clashes and dont add it to the filtered list
-                for t in ts:
-                    if times.get(t) is not None:
-                        clashes = True
-                        break
-                    else:
-                        times[t] = True
-                if clashes:
+
+    return list(iter_exhaustive_timetables(index, n_dels, n_opels, n_huels))
+
+
+def generate_exhaustive_array(
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+    n_dels: Annotated[int, "number of DELs selected"],
+    n_opels: Annotated[int, "number of OPELs selected"],
+    n_huels: Annotated[int, "number of HUELs selected"],
+) -> np.ndarray:
+    """
+    Function that generates all possible timetables (exhaustive and inclusive of clashes) as an array of section combination ids, one row per timetable and one column per course.
+    Rows are in the same order as generate_exhaustive_timetables, and can be passed to remove_clashes and remove_exam_clashes to check the clashes of all of them at once.
+
+    Args:
+        index (CourseIndex): compiled index of the selected courses
+        n_dels (int): number of DELs selected
+        n_opels (int): number of OPELs selected
+        n_huels (int): number of HUELs selected
+
+    Returns:
+        np.ndarray: possible timetables (inclusive of clashes), of shape (number of timetables, number of courses)
+    """
+    dtype = index.combination_id_dtype
+    arrays = []
+    for courses in get_course_options(index, n_dels, n_opels, n_huels):
+        # every choice of electives has the same number of courses, so they all fit in one array
+        if not courses:
+            # only the empty timetable
+            arrays.append(np.empty((1, 0), dtype=dtype))
+            continue
+        grid = np.meshgrid(*[np.array(options) for options in courses], indexing="ij")
+        arrays.append(np.stack(grid, axis=-1).reshape(-1, len(courses)).astype(dtype))
+    if not arrays:
+        return np.empty((0, 0), dtype=dtype)
+    return np.concatenate(arrays)
+
+
+def get_timetable_codes(
+    timetable: Annotated[Iterable[int], "timetable as section combination ids"],
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+) -> tuple:
+    """
+    Function that converts a timetable given as section combination ids back to course codes and sections
+
+    Args:
+        timetable (Iterable[int]): timetable as section combination ids (one per course)
+        index (CourseIndex): compiled index of the selected courses
+
+    Returns:
+        tuple: timetable as ((course, section combination), ...)
+    """
+    return tuple(index.combination_options[k] for k in timetable)
+
+
+def iter_timetables(
+    timetables: Annotated[Iterable, "timetables, one by one or as an array"],
+) -> Iterator[tuple]:
+    """
+    Function that iterates over timetables given either one by one or as the rows of an array of section combination ids (see generate_exhaustive_array), converting the rows a chunk at a time
+
+    Args:
+        timetables (Iterable): timetables, one by one or as an array
+
+    Yields:
+        tuple: timetable as section combination ids
+    """
+    if not isinstance(timetables, np.ndarray):
+        yield from timetables
+        return
+    for start in range(0, len(timetables), CHUNK_SIZE):
+        yield from map(tuple, timetables[start : start + CHUNK_SIZE].tolist())
+
+
+def iter_course_timetables(
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+    courses: Annotated[list[list[int]], "section combination ids of each course"],
+) -> Iterator[tuple]:
+    """
+    Function that generates the timetables without clashes (classes and exams) for one choice of electives, using a depth first search.
+    Courses are assigned one at a time, and a partial timetable is abandoned as soon as it clashes, so the clashing timetables are never built.
+    Clashes are looked up in the precomputed compatibility matrix of the index, and a partial timetable is also abandoned once some course left to assign has no compatible section combination.
+
+    Args:
+        index (CourseIndex): compiled index of the selected courses
+        courses (list[list[int]]): ids of the section combinations of each course (one entry of get_course_options)
+
+    Yields:
+        tuple: timetable without any clashes (classes and exams) as section combination ids, in the order product(*courses) would give them
+    """
+    # section combinations that clash within their own course are dropped before anything else
+    courses = [
+        [k for k in options if index.valid_combinations >> k & 1] for options in courses
+    ]
+    if not courses:
+        yield ()
+        return
+    # bitset of the section combinations of each course, to see if a course has any option left
+    course_bits = [sum(1 << k for k in options) for options in courses]
+    timetable = [None] * len(courses)
+
+    def search(depth: int, allowed: int):
+        # allowed is the bitset of section combinations compatible with everything chosen so far
+        if depth == len(courses) - 1:
+            # last course, every compatible option completes a timetable
+            for k in courses[depth]:
+                if allowed >> k & 1:
+                    timetable[depth] = k
+                    yield tuple(timetable)
+            return
+        for k in courses[depth]:
+            if not allowed >> k & 1:
+                continue
+            remaining = allowed & index.compatible[k]
+            # prune if some course that is yet to be assigned has no compatible option left
+            for bits in course_bits[depth + 1 :]:
+                if not remaining & bits:
                     break
-            if clashes:
-                break
-        # if no clashes, add it to the filtered list
-        if not clashes:
-            filtered.append(timetable)
+            else:
+                timetable[depth] = k
+                yield from search(depth + 1, remaining)
 
-    return filtered
+    yield from search(0, index.valid_combinations)
 
 
-def remove_exam_clashes(
-    timetables: Annotated[list, "list of timetables without any clashes (classes)"],
-    json: Annotated[dict, "filtered json file"],
-):
+def generate_timetables_without_clashes(
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+    n_dels: Annotated[int, "number of DELs selected"],
+    n_opels: Annotated[int, "number of OPELs selected"],
+    n_huels: Annotated[int, "number of HUELs selected"],
+) -> Iterator[tuple]:
     """
-    Function that filters out timetables with exam clashes.
+    Function that generates only the timetables without clashes (classes and exams), using a depth first search (see iter_course_timetables).
+    Timetables are yielded in the same order as remove_exam_clashes(remove_clashes(generate_exhaustive_timetables(...))) would return them.
 
     Args:
-        timetables (list): list of timetables without any clashes (classes)
-        json (dict): filtered json file
+        index (CourseIndex): compiled index of the selected courses
+        n_dels (int): number of DELs selected
+        n_opels (int): number of OPELs selected
+        n_huels (int): number of HUELs selected
+
+    Yields:
+        tuple: timetable without any clashes (classes and exams), as section combination ids
+    """
+    for courses in get_course_options(index, n_dels, n_opels, n_huels):
+        yield from iter_course_timetables(index, courses)
+
+
+def count_timetables(
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+    n_dels: Annotated[int, "number of DELs selected"],
+    n_opels: Annotated[int, "number of OPELs selected"],
+    n_huels: Annotated[int, "number of HUELs selected"],
+) -> tuple[int, int]:
+    """
+    Function that counts the timetables without clashes, without generating them.
+    Courses are assigned one at a time like in generate_timetables_without_clashes, but only the slots in use matter for how the remaining courses can be assigned, so the number of ways to complete a partial timetable is memoized on those slots (dynamic programming) instead of being enumerated again.
+    Exam clashes are between courses, not sections, so a choice of electives either has all of its timetables clashing on exams or none of them.
+
+    Args:
+        index (CourseIndex): compiled index of the selected courses
+        n_dels (int): number of DELs selected
+        n_opels (int): number of OPELs selected
+        n_huels (int): number of HUELs selected
 
     Returns:
-        list: list of timetables without any clashes (classes and exams)
+        tuple[int, int]: number of timetables without clashes (classes), and number of timetables without clashes (classes and exams)
     """
-    no_exam_clashes = []
-    for timetable in timetables:
-        mids_times: dict[str, int] = dict()
-        compres_times: dict[str, int] = dict()
+    n_without_class_clashes = 0
+    n_without_clashes = 0
+    for courses in get_course_options(index, n_dels, n_opels, n_huels):
+        # section combinations that clash within their own course can never be taken
+        courses = [
+            [k for k in options if index.valid_combinations >> k & 1]
+            for options in courses
+        ]
+        if not all(courses):
+            continue
+        # slots that the courses from a depth onwards can use, only those slots in use can affect the rest of the timetable
+        rest_masks = [0] * (len(courses) + 1)
+        for depth in range(len(courses) - 1, -1, -1):
+            rest_masks[depth] = rest_masks[depth + 1]
+            for k in courses[depth]:
+                rest_masks[depth] |= index.combination_masks[k]
+        # format: {(depth, slots in use): number of ways to assign the courses from depth onwards}
+        counts: dict[tuple[int, int], int] = {}
+
+        def count(depth: int, times: int) -> int:
+            if depth == len(courses):
+                return 1
+            state = (depth, times & rest_masks[depth])
+            if state not in counts:
+                counts[state] = sum(
+                    count(depth + 1, times | index.combination_masks[k])
+                    for k in courses[depth]
+                    if not times & index.combination_masks[k]
+                )
+            return counts[state]
+
+        n = count(0, 0)
+        n_without_class_clashes += n
+        course_ids = [index.combination_courses[options[0]] for options in courses]
+        if not any(index.exams_clash(a, b) for a, b in combinations(course_ids, 2)):
+            n_without_clashes += n
+    return n_without_class_clashes, n_without_clashes
+
+
+def iter_without_clashes(
+    timetables: Annotated[Iterable, "possible timetables (inclusive of clashes)"],
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+) -> Iterator[tuple]:
+    """
+    Function that lazily filters out timetables with clashes, consuming and yielding one timetable at a time
+
+    Args:
+        timetables (Iterable): possible timetables (inclusive of clashes)
+        index (CourseIndex): compiled index of the selected courses
+
+    Yields:
+        tuple: timetable without clashes
+    """
+    for timetable in iter_timetables(timetables):
+        # bitmask of the slots currently held as "in use" by some course's section
+        times = 0
         clashes = False
-        for course in timetable:
-            # get exam times
-            if course[0] in json["CDCs"]:
-                mid = json["CDCs"][course[0]]["exams"][0].get("midsem", "")
-                compre = json["CDCs"][course[0]]["exams"][0].get("compre", "")
-            elif course[0] in json["DEls"]:
-                mid = json["DEls"][course[0]]["exams"][0].get("midsem", "")
-                compre = json["DEls"][course[0]]["exams"][0].get("compre", "")
-            elif course[0] in json["HUELs"]:
-                mid = json["HUELs"][course[0]]["exams"][0].get("midsem", "")
-                compre = json["HUELs"][course[0]]["exams"][0].get("compre", "")
-            elif course[0] in json["OPELs"]:
-                mid = json["OPELs"][course[0]]["exams"][0].get("midsem", "")
-                compre = json["OPELs"][course[0]]["exams"][0].get("compre", "")
-            else:
-                raise Exception("Course code not found in any category")
-            mids_times[mid] = mids_times.get(mid, 0) + 1
-            compres_times[compre] = compres_times.get(compre, 0) + 1
-        # see if more than one course has the same exam time
-        for time in mids_times:
-            if mids_times[time] > 1 and time != None:
+        # the section combination chosen for each course
+        for k in timetable:
+            slots = index.combination_masks[k]
+            # if the sections clash with each other, or any slot of them is already in use, then there is a clash
+            # if so, mark it as clashes and dont add it to the filtered list
+            if not index.valid_combinations >> k & 1 or times & slots:
                 clashes = True
                 break
+            times |= slots
+        # if no clashes, pass it on
         if not clashes:
-            for time in compres_times:
-                if compres_times[time] > 1 and time != None:
-                    clashes = True
-                    break
-        # for i in range(len(mids_times)):
-        #     for j in range(i + 1, len(mids_times)):
-        #         if mids_times[i] == mids_times[j]:
-        #             clashes = True
-        #             break
-        #     if clashes:
-        #         break
-        # if not clashes:
-        #     for i in range(len(compres_times)):
-        #         for j in range(i + 1, len(compres_times)):
-        #             if compres_times[i] == compres_times[j]:
-        #                 clashes = True
-        #                 break
-        #         if clashes:
-        #             break
-        # add to filtered list only if no clashes
+            yield timetable
+
+
+def remove_clashes(
+    timetables: Annotated[
+        list | np.ndarray, "exhaustive list of all possible timetables"
+    ],
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+) -> list | np.ndarray:
+    """
+    Function that filters out timetables with clashes.
+    Timetables can also be given as an array of section combination ids (see generate_exhaustive_array), in which case the clashes of all of them are checked at once with NumPy, and the rows without clashes are returned as an array.
+
+    Args:
+        timetables (list | np.ndarray): exhaustive list of all possible timetables
+        index (CourseIndex): compiled index of the selected courses
+
+    Returns:
+        list | np.ndarray: list of timetables without clashes
+    """
+    if not isinstance(timetables, np.ndarray):
+        return list(iter_without_clashes(timetables, index))
+
+    # sections of the same course clashing with each other
+    clashes = ~index.combination_valid[timetables].all(axis=1)
+    # slots currently held as "in use" by some course's section, as 64 bit words for every timetable
+    times = np.zeros((len(timetables), index.combination_words.shape[1]), np.uint64)
+    for column in timetables.T:
+        slots = index.combination_words[column]
+        clashes |= (times & slots).any(axis=1)
+        times |= slots
+    return timetables[~clashes]
+
+
+def iter_without_exam_clashes(
+    timetables: Annotated[Iterable, "timetables without any clashes (classes)"],
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+) -> Iterator[tuple]:
+    """
+    Function that lazily filters out timetables with exam clashes, consuming and yielding one timetable at a time
+
+    Args:
+        timetables (Iterable): timetables without any clashes (classes)
+        index (CourseIndex): compiled index of the selected courses
+
+    Yields:
+        tuple: timetable without any clashes (classes and exams)
+    """
+    for timetable in iter_timetables(timetables):
+        # bitmask of the exam slots already taken by some course
+        exam_times = 0
+        clashes = False
+        for k in timetable:
+            course_id = index.combination_courses[k]
+            # see if any exam of the course overlaps an exam already taken
+            if exam_times & index.course_exam_overlaps[course_id]:
+                clashes = True
+                break
+            exam_times |= index.course_exam_slots[course_id]
+        # pass it on only if no clashes
         if not clashes:
-            no_exam_clashes.append(timetable)
-    return no_exam_clashes
+            yield timetable
+
+
+def remove_exam_clashes(
+    timetables: Annotated[
+        list | np.ndarray, "list of timetables without any clashes (classes)"
+    ],
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+):
+    """
+    Function that filters out timetables with exam clashes.
+    Timetables can also be given as an array of section combination ids (see generate_exhaustive_array), in which case the exam clashes of all of them are checked at once with NumPy, and the rows without clashes are returned as an array.
+
+    Args:
+        timetables (list | np.ndarray): list of timetables without any clashes (classes)
+        index (CourseIndex): compiled index of the selected courses
+
+    Returns:
+        list | np.ndarray: list of timetables without any clashes (classes and exams)
+    """
+    if not isinstance(timetables, np.ndarray):
+        return list(iter_without_exam_clashes(timetables, index))
+
+    clashes = np.zeros(len(timetables), dtype=bool)
+    # course in each column
+    courses = index.combination_course_ids[timetables]
+    # see if the exams of any two courses overlap, using the precomputed table of courses with overlapping exams
+    for i, j in combinations(range(timetables.shape[1]), 2):
+        clashes |= index.course_exam_clashes[courses[:, i], courses[:, j]]
+    return timetables[~clashes]
+
+
+def get_day_wise_score(
+    timetable: Annotated[Iterable[int], "timetable without clashes"],
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+    free_days: Annotated[list[str], "list of days to be free if possible"],
+) -> tuple[int, list[int]]:
+    """
+    Function that computes how many of the free days a timetable keeps free, and its number of classes on each day
+
+    Args:
+        timetable (Iterable[int]): timetable without clashes, as section combination ids
+        index (CourseIndex): compiled index of the selected courses
+        free_days (list): list of days to be free if possible
+
+    Returns:
+        tuple[int, list[int]]: number of free days matched, and the number of classes on each day in the order (M, T, W, Th, F, S, Su)
+    """
+    # slots used and number of classes on each day
+    times = 0
+    loads = [0] * len(DAYS)
+    for k in timetable:
+        times |= index.combination_masks[k]
+        day_loads = index.combination_loads[k]
+        for i in range(len(DAYS)):
+            loads[i] += day_loads[i]
+
+    n_free = 0
+    for day in free_days:
+        if not times & DAY_MASKS[day]:
+            n_free += 1
+    return n_free, loads
+
+
+def passes_free_days_filter(
+    n_free: Annotated[int, "number of free days matched"],
+    free_days: Annotated[list[str], "list of days to be free if possible"],
+    strong: Annotated[bool, "whether to use strong filter or not"] = False,
+) -> bool:
+    """
+    Function that checks if a timetable keeps enough of the free days free to pass the filter
+
+    Args:
+        n_free (int): number of free days matched
+        free_days (list): list of days to be free if possible
+        strong (bool, optional): whether to use strong filter (all free days) or not (atleast one). Defaults to False.
+
+    Returns:
+        bool: True if the timetable passes the filter, False otherwise
+    """
+    # if not strong filter, then if atleast some of the required free days are free, then it matches
+    if n_free > 0 and not strong:
+        return True
+    return n_free == len(free_days)
+
+
+def iter_day_wise_filter(
+    timetables: Annotated[Iterable, "timetables without clashes"],
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+    free_days: Annotated[list[str], "list of days to be free if possible"],
+    filter: Annotated[bool, "whether to filter or to just score"] = False,
+    strong: Annotated[bool, "whether to use strong filter or not"] = False,
+) -> Iterator[tuple]:
+    """
+    Function that lazily scores (and optionally filters) timetables based on the free days, consuming and yielding one timetable at a time.
+    Unlike day_wise_filter, the timetables are not sorted, they are yielded in the order they come in.
+
+    Args:
+        timetables (Iterable): timetables without clashes
+        index (CourseIndex): compiled index of the selected courses
+        free_days (list): list of days to be free if possible
+        filter (bool, optional): whether to filter or to just score. Defaults to False.
+        strong (bool, optional): whether to use strong filter or not. Defaults to False.
+
+    Yields:
+        tuple: (number of free days matched, number of classes on each day (M, T, W, Th, F, S, Su), timetable)
+    """
+    for timetable in iter_timetables(timetables):
+        n_free, daily_scores = get_day_wise_score(timetable, index, free_days)
+        if filter and not passes_free_days_filter(n_free, free_days, strong):
+            continue
+        yield (n_free, daily_scores, timetable)
+
+
+def get_rank_key(
+    free_days: Annotated[list[str], "list of days to be free if possible"],
+    lite_order: Annotated[
+        list[str],
+        "increasing order of how lite you want days to be (earlier means more lite)",
+    ],
+    strong: Annotated[bool, "whether to use strong filter or not"] = False,
+) -> Callable[[tuple], tuple]:
+    """
+    Function that builds the key timetables are ranked by (smaller is better): timetables matching the free days first, then the daily scores in the lite order (ascending), then the number of free days matched (descending)
+
+    Args:
+        free_days (list): list of days to be free if possible
+        lite_order (list): increasing order of how lite you want days to be (earlier means more lite)
+        strong (bool, optional): whether to use strong filter or not. Defaults to False.
+
+    Returns:
+        Callable[[tuple], tuple]: key function for (free days matched, daily scores (M, T, W, Th, F, S, Su), timetable) tuples
+    """
+    # positions of the days in the lite order, in the daily scores
+    order = [DAYS.index(day) for day in lite_order]
+
+    def key(timetable: tuple) -> tuple:
+        n_free, daily_scores = timetable[0], timetable[1]
+        return (
+            not passes_free_days_filter(n_free, free_days, strong),
+            [daily_scores[i] for i in order],
+            -n_free,
+        )
+
+    return key
 
 
 def day_wise_filter(
-    timetables: Annotated[list, "list of timetables without clashes"],
-    json: Annotated[dict, "filtered json file"],
+    timetables: Annotated[Iterable, "timetables without clashes"],
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
     free_days: Annotated[list[str], "list of days to be free if possible"],
     lite_order: Annotated[
         list[str],
@@ -333,187 +732,744 @@ def day_wise_filter(
     ],
     filter: Annotated[bool, "whether to filter or to just sort"] = False,
     strong: Annotated[bool, "whether to use strong filter or not"] = False,
+    top_k: Annotated[int | None, "number of best timetables to keep"] = None,
 ) -> list:
     """
     Function that filters out timetables based on the number of free days and the lite order. Lite order is the order in which you want the days to be lite. For example, if you want Saturday to be the most lite day, then lite_order = ["S", "Su", "M", "T", "W", "Th", "F"] (set the order of the other 6 accordingly))
+    If top_k is given, only the best top_k timetables are kept, using a heap of that size instead of sorting all of them (O(N log K) time and O(K) memory). They are in the same order as the first top_k of the full sort.
 
     Args:
-        timetables (list): list of timetables without clashes
-        json (dict): filtered json file, i.e, with only courses selected
+        timetables (Iterable): timetables without clashes
+        index (CourseIndex): compiled index of the selected courses
         free_days (list): list of days to be free if possible
         lite_order (list): increasing order of how lite you want days to be (earlier means more lite)
         filter (bool, optional): whether to filter or to just sort. Defaults to False.
         strong (bool, optional): whether to use strong filter or not. Defaults to False.
+        top_k (int, optional): number of best timetables to keep. Defaults to None (keep all).
 
     Returns:
-        list: list of timetables after filtering. They are sorted based on how many of the free days they have and how lite the days are.
-    """
-    # format: (n days matched free, timetable)
-    matches_free_days: list[tuple] = []
-    # format: (daily scores in a list [0, 4, 5, ...], timetable)
-    others: list[tuple] = []
-
-    day_dict = {
-        "M": 0,
-        "T": 1,
-        "W": 2,
-        "Th": 3,
-        "F": 4,
-        "S": 5,
-        "Su": 6,
-    }
-
-    for timetable in timetables:
-        # will contain the hours of each day where there is a class
-        # used for calculating the daily scores and if it matches the free days
-        schedule = {
-            "M": [],
-            "T": [],
-            "W": [],
-            "Th": [],
-            "F": [],
-            "S": [],
-            "Su": [],
-        }
-        for course in timetable:
-            for sec in course[1]:
-                # getting the schedule of the selected section
-                if course[0] in json["CDCs"]:
-                    sched = json["CDCs"][course[0]]["sections"][sec]["schedule"]
-                elif course[0] in json["DEls"]:
-                    sched = json["DEls"][course[0]]["sections"][sec]["schedule"]
-                elif course[0] in json["HUELs"]:
-                    sched = json["HUELs"][course[0]]["sections"][sec]["schedule"]
-                elif course[0] in json["OPELs"]:
-                    sched = json["OPELs"][course[0]]["sections"][sec]["schedule"]
-                else:
-                    raise Exception("Course code not found in any category")
-                # since no clashes, we can just append the hours to the schedule
-                for i in range(len(sched)):
-                    for day in sched[i]["days"]:
-                        schedule[day].append(sched[i]["hours"])
-        # calculating the daily scores
-        daily_scores = [len(v) for k, v in schedule.items()]
-        # reordering the daily scores to match the lite order
-        daily_scores = [daily_scores[day_dict[day]] for day in lite_order]
-
-        n_free = 0
+        list: list of timetables after filtering, as (free days matched, daily scores (M, T, W, Th, F, S, Su), timetable). They are sorted based on how many of the free days they have and how lite the days are.
+    """
+    scored = iter_day_wise_filter(timetables, index, free_days, filter, strong)
+
+    # timetables matching the free days come first, then sorting based on the daily scores (ascending) and then the number of free days (descending)
+    # both sorted and nsmallest are stable, so ties stay in the order the timetables came in
+    key = get_rank_key(free_days, lite_order, strong)
+    if top_k is None:
+        return sorted(scored, key=key)
+    return heapq.nsmallest(top_k, scored, key=key)
+
+
+def get_rank_order(
+    loads: Annotated[np.ndarray, "number of classes on each day of each timetable"],
+    day_hours: Annotated[
+        np.ndarray, "bitmask of the hours with a class on each day of each timetable"
+    ],
+    free_days: Annotated[list[str], "list of days to be free if possible"],
+    lite_order: Annotated[
+        list[str],
+        "increasing order of how lite you want days to be (earlier means more lite)",
+    ],
+    filter: Annotated[bool, "whether to filter or to just sort"] = False,
+    strong: Annotated[bool, "whether to use strong filter or not"] = False,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Function that ranks timetables from their daily loads and hours alone, with a single lexsort over all of them instead of scoring them one at a time. Ranks them the same as get_rank_key (ties stay in the order the timetables are in).
+
+    Args:
+        loads (np.ndarray): number of classes on each day (M, T, W, Th, F, S, Su) of each timetable, shape (number of timetables, 7)
+        day_hours (np.ndarray): bitmask of the hours with a class on each day of each timetable, shape (number of timetables, 7)
+        free_days (list): list of days to be free if possible
+        lite_order (list): increasing order of how lite you want days to be (earlier means more lite)
+        filter (bool, optional): whether to filter or to just sort. Defaults to False.
+        strong (bool, optional): whether to use strong filter or not. Defaults to False.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: positions of the timetables from best to worst (only the ones passing the filter if filter), and the number of free days matched by each timetable
+    """
+    n_free = np.zeros(len(loads), dtype=np.int64)
+    for day in free_days:
+        n_free += day_hours[:, DAYS.index(day)] == 0
+    # same as passes_free_days_filter
+    passes = n_free == len(free_days)
+    if not strong:
+        passes |= n_free > 0
+
+    # lexsort sorts by the last key first: matching the free days, then the daily scores in the lite order, then the number of free days (descending)
+    keys = [-n_free]
+    keys.extend(loads[:, DAYS.index(day)] for day in reversed(lite_order))
+    keys.append(~passes)
+    order = np.lexsort(keys)
+    if filter:
+        order = order[passes[order]]
+    return order, n_free
+
+
+def rank_timetables(
+    timetables: Annotated[ResultStore, "timetables without clashes"],
+    free_days: Annotated[list[str], "list of days to be free if possible"],
+    lite_order: Annotated[
+        list[str],
+        "increasing order of how lite you want days to be (earlier means more lite)",
+    ],
+    filter: Annotated[bool, "whether to filter or to just sort"] = False,
+    strong: Annotated[bool, "whether to use strong filter or not"] = False,
+    top_k: Annotated[int | None, "number of best timetables to keep"] = None,
+) -> list:
+    """
+    Function that does the same as day_wise_filter for timetables in a result store, using the daily loads and hours stored with them (see get_rank_order), so changing the free days, the lite order or the filter does not go through the timetables again. Only the timetables returned are read from the store.
+
+    Args:
+        timetables (ResultStore): timetables without clashes
+        free_days (list): list of days to be free if possible
+        lite_order (list): increasing order of how lite you want days to be (earlier means more lite)
+        filter (bool, optional): whether to filter or to just sort. Defaults to False.
+        strong (bool, optional): whether to use strong filter or not. Defaults to False.
+        top_k (int, optional): number of best timetables to keep. Defaults to None (keep all).
+
+    Returns:
+        list: list of timetables after filtering, as (free days matched, daily scores (M, T, W, Th, F, S, Su), timetable), in the same order as day_wise_filter
+    """
+    order, n_free = get_rank_order(
+        timetables.loads, timetables.day_hours, free_days, lite_order, filter, strong
+    )
+    return get_ranked_timetables(timetables, order[:top_k], n_free)
+
+
+def get_ranked_timetables(
+    timetables: Annotated[ResultStore, "timetables without clashes"],
+    order: Annotated[np.ndarray, "positions of the timetables to read"],
+    n_free: Annotated[np.ndarray, "number of free days matched by each timetable"],
+) -> list:
+    """
+    Function that reads some of the timetables ranked by get_rank_order from a result store, eg: only the ones to be exported, so the rest are never read.
+
+    Args:
+        timetables (ResultStore): timetables without clashes
+        order (np.ndarray): positions of the timetables to read, eg: a slice of the order from get_rank_order
+        n_free (np.ndarray): number of free days matched by each timetable, from get_rank_order
+
+    Returns:
+        list: list of timetables, as (free days matched, daily scores (M, T, W, Th, F, S, Su), timetable), in the order given
+    """
+    n_free = n_free[order].tolist()
+    loads = timetables.loads[order].tolist()
+    rows = timetables.rows[order]
+    if timetables.scored:
+        # the free days matched and the daily scores written with the timetables are left out, they are worked out again for these free days
+        rows = rows[:, 1 + len(DAYS) :]
+    rows = rows.tolist()
+    return [(n_free[i], loads[i], tuple(row)) for i, row in enumerate(rows)]
+
+
+def find_best_timetables(
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+    n_dels: Annotated[int, "number of DELs selected"],
+    n_opels: Annotated[int, "number of OPELs selected"],
+    n_huels: Annotated[int, "number of HUELs selected"],
+    free_days: Annotated[list[str], "list of days to be free if possible"],
+    lite_order: Annotated[
+        list[str],
+        "increasing order of how lite you want days to be (earlier means more lite)",
+    ],
+    n_best: Annotated[int, "number of best timetables to find"] = 100,
+    filter: Annotated[bool, "whether to filter or to just sort"] = False,
+    strong: Annotated[bool, "whether to use strong filter or not"] = False,
+) -> list:
+    """
+    Function that finds the best timetables without enumerating all the timetables without clashes, using a branch and bound search.
+    Adding a course never removes classes from a day, so the classes of a partial timetable (plus the least the remaining courses can add) bound its daily scores from below, and its free days from above.
+    A partial timetable is abandoned as soon as that bound cannot beat the worst of the best timetables found so far.
+    Gives the same result as day_wise_filter(generate_timetables_without_clashes(...), ..., top_k=n_best).
+
+    Args:
+        index (CourseIndex): compiled index of the selected courses
+        n_dels (int): number of DELs selected
+        n_opels (int): number of OPELs selected
+        n_huels (int): number of HUELs selected
+        free_days (list): list of days to be free if possible
+        lite_order (list): increasing order of how lite you want days to be (earlier means more lite)
+        n_best (int, optional): number of best timetables to find. Defaults to 100.
+        filter (bool, optional): whether to filter or to just sort. Defaults to False.
+        strong (bool, optional): whether to use strong filter or not. Defaults to False.
+
+    Returns:
+        list: the best timetables, as (free days matched, daily scores (M, T, W, Th, F, S, Su), timetable), in the same order as day_wise_filter
+    """
+    if n_best <= 0:
+        return []
+    # positions of the days in the lite order, in the daily scores
+    order = [DAYS.index(day) for day in lite_order]
+    # format: (rank key, position, timetable), sorted by rank key and then position
+    # timetables are not found in generation order here, so the position of a timetable in generation order (choice of electives, section combination ids) is kept to break ties the same way the stable sort of day_wise_filter does
+    best: list[tuple] = []
+
+    for electives, courses in enumerate(
+        get_course_options(index, n_dels, n_opels, n_huels)
+    ):
+        courses = [
+            [k for k in options if index.valid_combinations >> k & 1]
+            for options in courses
+        ]
+        # format: [(daily scores in the lite order, bitset of the section combinations with those scores), ...] for each course
+        # sorted by daily scores, to find the best daily scores a course can still add
+        lite_bits = []
+        # format: [bitset of the section combinations with no class on the free day, ...] for each course
+        free_bits = []
+        for options in courses:
+            bits: dict[tuple, int] = {}
+            for k in options:
+                scores = tuple(index.combination_loads[k][i] for i in order)
+                bits[scores] = bits.get(scores, 0) | 1 << k
+            lite_bits.append(sorted(bits.items()))
+            free_bits.append(
+                [
+                    sum(
+                        1 << k
+                        for k in options
+                        if not index.combination_masks[k] & DAY_MASKS[day]
+                    )
+                    for day in free_days
+                ]
+            )
+        # bitset of the section combinations of the courses from a depth onwards
+        rest_bits = [0] * (len(courses) + 1)
+        for depth in range(len(courses) - 1, -1, -1):
+            rest_bits[depth] = rest_bits[depth + 1] | sum(
+                1 << k for k in courses[depth]
+            )
+        free_mask = 0
         for day in free_days:
-            if len(schedule[day]) == 0:
-                n_free += 1
-
-        # if not strong filter, then if atleast some of the required free days are free, then add it to the list
-        if n_free > 0 and not strong:
-            matches_free_days.append((n_free, daily_scores, timetable))
-        elif n_free == len(free_days):
-            matches_free_days.append((n_free, daily_scores, timetable))
-        else:
-            others.append((n_free, daily_scores, timetable))
-
-    # sorting based on the number of free days (descending) and then the daily scores (ascending)
-    matches_free_days = sorted(matches_free_days, key=itemgetter(0), reverse=True)
-    matches_free_days = sorted(matches_free_days, key=itemgetter(1))
-
-    others = sorted(others, key=itemgetter(0), reverse=True)
-    others = sorted(others, key=itemgetter(1))
-
-    # reorder back to original order (M, T, W, Th, F, S, Su)
-    original_order = {
-        "M": lite_order.index("M"),
-        "T": lite_order.index("T"),
-        "W": lite_order.index("W"),
-        "Th": lite_order.index("Th"),
-        "F": lite_order.index("F"),
-        "S": lite_order.index("S"),
-        "Su": lite_order.index("Su"),
-    }
-    for i in range(len(matches_free_days)):
-        matches_free_days[i] = (
-            matches_free_days[i][0],
-            [matches_free_days[i][1][original_order[day]] for day in original_order],
-            matches_free_days[i][2],
-        )
+            free_mask |= DAY_MASKS[day]
+        timetable = [None] * len(courses)
+        position = [electives] + [None] * len(courses)
+        # timetables added to the best so far, in the order they were found
+        found: list[tuple] = []
+        # partial timetables with the same daily loads, free days and compatible options for the remaining courses can be completed the exact same ways
+        # format: {state: (position of the partial timetable that explored it, start, end of the timetables found completing it)}
+        # a partial timetable in the same state that comes later in generation order reuses them instead of searching again, as its completions only lose ties to the ones of the first, so whatever could not make it the first time cannot make it now either
+        # children are explored by bound and not in generation order, so one that comes earlier could win ties the first one lost, and has to search again
+        explored: dict[tuple, tuple[list, int, int]] = {}
+
+        def add(entry: tuple) -> None:
+            # add a timetable to the best so far, unless it cannot beat the worst of them
+            if len(best) == n_best and entry[:2] > best[-1][:2]:
+                return
+            bisect.insort(best, entry)
+            if len(best) > n_best:
+                best.pop()
+            found.append(entry)
+
+        def get_bound(depth: int, allowed: int, times: int, loads: list[int]):
+            # lower bound on the rank key of any timetable completing a partial timetable (None if it cannot be completed)
+            # ignoring clashes between the remaining courses, the best daily scores (compared lexicographically) come from each course taking its best compatible option
+            least = [loads[i] for i in order]
+            for course in lite_bits[depth:]:
+                for scores, bits in course:
+                    if allowed & bits:
+                        for i in range(len(DAYS)):
+                            least[i] += scores[i]
+                        break
+                else:
+                    # no compatible option left for the course
+                    return None
+            # a free day stays free only if no class is on it yet and every course can still avoid it
+            n_free = 0
+            for f, day in enumerate(free_days):
+                if times & DAY_MASKS[day]:
+                    continue
+                for course in free_bits[depth:]:
+                    if not allowed & course[f]:
+                        break
+                else:
+                    n_free += 1
+            key = (
+                not passes_free_days_filter(n_free, free_days, strong),
+                least,
+                -n_free,
+            )
+            return key, n_free
+
+        def search(
+            depth: int,
+            allowed: int,
+            times: int,
+            loads: list[int],
+            bound: tuple,
+            n_free: int,
+        ):
+            # bound is a lower bound on the rank key of any timetable completing this partial timetable
+            if filter and bound[0]:
+                return
+            # abandon if even the bound (and the earliest position) cannot beat the worst of the best so far
+            if len(best) == n_best:
+                worst = best[-1]
+                if (bound, position[: depth + 1]) > (worst[0], worst[1][: depth + 1]):
+                    return
+            if depth == len(courses):
+                # complete timetable, the bound is its exact rank key
+                add((bound, list(position), (n_free, loads, tuple(timetable))))
+                return
+            state = (depth, allowed & rest_bits[depth], tuple(loads), times & free_mask)
+            prefix = position[: depth + 1]
+            if state in explored and prefix > explored[state][0]:
+                _, start, end = explored[state]
+                for entry in found[start:end]:
+                    add(
+                        (
+                            entry[0],
+                            prefix + entry[1][depth + 1 :],
+                            (
+                                entry[2][0],
+                                entry[2][1],
+                                tuple(timetable[:depth]) + entry[2][2][depth:],
+                            ),
+                        )
+                    )
+                return
+            start = len(found)
+            # try the most promising section combinations first, so that good timetables are found early and the bound prunes more
+            children = []
+            for k in courses[depth]:
+                if not allowed >> k & 1:
+                    continue
+                remaining = allowed & index.compatible[k]
+                child_times = times | index.combination_masks[k]
+                day_loads = index.combination_loads[k]
+                child_loads = [loads[i] + day_loads[i] for i in range(len(DAYS))]
+                child = get_bound(depth + 1, remaining, child_times, child_loads)
+                if child is not None:
+                    children.append(
+                        (child[0], k, remaining, child_times, child_loads, child[1])
+                    )
+            children.sort(key=itemgetter(0, 1))
+            for (
+                child_bound,
+                k,
+                remaining,
+                child_times,
+                child_loads,
+                child_free,
+            ) in children:
+                timetable[depth] = k
+                position[depth + 1] = k
+                search(
+                    depth + 1,
+                    remaining,
+                    child_times,
+                    child_loads,
+                    child_bound,
+                    child_free,
+                )
+            explored[state] = (prefix, start, len(found))
+
+        root = get_bound(0, index.valid_combinations, 0, [0] * len(DAYS))
+        if root is not None:
+            search(0, index.valid_combinations, 0, [0] * len(DAYS), *root)
+
+    return [entry[2] for entry in best]
+
+
+def get_shards(
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+    n_dels: Annotated[int, "number of DELs selected"],
+    n_opels: Annotated[int, "number of OPELs selected"],
+    n_huels: Annotated[int, "number of HUELs selected"],
+    n_shards: Annotated[int, "minimum number of shards wanted"],
+) -> list[list[list[int]]]:
+    """
+    Function that splits the search space into shards that can be searched independently, by fixing the section combination of the first few courses.
+    Each shard is a list (one per course) of section combination ids like the entries of get_course_options, and the shards are in generation order, so searching them one after the other gives the same timetables in the same order as generate_timetables_without_clashes.
+
+    Args:
+        index (CourseIndex): compiled index of the selected courses
+        n_dels (int): number of DELs selected
+        n_opels (int): number of OPELs selected
+        n_huels (int): number of HUELs selected
+        n_shards (int): minimum number of shards wanted (fewer are made if the courses cannot be split that much)
 
-    for i in range(len(others)):
-        others[i] = (
-            others[i][0],
-            [others[i][1][original_order[day]] for day in original_order],
-            others[i][2],
+    Returns:
+        list[list[list[int]]]: shards, in generation order
+    """
+    shards = [
+        [
+            [k for k in options if index.valid_combinations >> k & 1]
+            for options in courses
+        ]
+        for courses in get_course_options(index, n_dels, n_opels, n_huels)
+    ]
+    depth = 0
+    # split on one more course at a time, until there are enough shards
+    while len(shards) < n_shards and any(depth < len(shard) for shard in shards):
+        split = []
+        for shard in shards:
+            if depth < len(shard):
+                for k in shard[depth]:
+                    split.append(shard[:depth] + [[k]] + shard[depth + 1 :])
+            else:
+                split.append(shard)
+        shards = split
+        depth += 1
+    return shards
+
+
+# compiled index of the selected courses, set once in every worker process by init_worker instead of being sent with every shard
+worker_index: CourseIndex | None = None
+
+
+def init_worker(index: CourseIndex) -> None:
+    """
+    Function that sets up a worker process of parallel_day_wise_filter
+
+    Args:
+        index (CourseIndex): compiled index of the selected courses
+    """
+    global worker_index
+    worker_index = index
+
+
+def search_shard(
+    shard: list[list[int]],
+    free_days: list[str],
+    lite_order: list[str],
+    filter: bool,
+    strong: bool,
+    top_k: int | None,
+) -> list:
+    """
+    Function that generates, filters and ranks the timetables of one shard, in a worker process
+
+    Args:
+        shard (list[list[int]]): ids of the section combinations of each course (see get_shards)
+        free_days (list): list of days to be free if possible
+        lite_order (list): increasing order of how lite you want days to be (earlier means more lite)
+        filter (bool): whether to filter or to just sort
+        strong (bool): whether to use strong filter or not
+        top_k (int | None): number of best timetables to keep (None keeps all)
+
+    Returns:
+        list: best timetables of the shard, as returned by day_wise_filter
+    """
+    timetables = iter_course_timetables(worker_index, shard)
+    return day_wise_filter(
+        timetables, worker_index, free_days, lite_order, filter, strong, top_k
+    )
+
+
+def parallel_day_wise_filter(
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+    n_dels: Annotated[int, "number of DELs selected"],
+    n_opels: Annotated[int, "number of OPELs selected"],
+    n_huels: Annotated[int, "number of HUELs selected"],
+    free_days: Annotated[list[str], "list of days to be free if possible"],
+    lite_order: Annotated[
+        list[str],
+        "increasing order of how lite you want days to be (earlier means more lite)",
+    ],
+    filter: Annotated[bool, "whether to filter or to just sort"] = False,
+    strong: Annotated[bool, "whether to use strong filter or not"] = False,
+    top_k: Annotated[int | None, "number of best timetables to keep"] = None,
+    n_workers: Annotated[int | None, "number of worker processes"] = None,
+) -> list:
+    """
+    Function that generates, filters and ranks the timetables on multiple cores.
+    The search space is split into shards (see get_shards) which are searched by a pool of worker processes, each keeping only its own top_k. Every timetable in the overall top_k is in the top_k of its shard, so merging those gives the overall top_k.
+    Gives the same result as day_wise_filter(generate_timetables_without_clashes(...), ..., top_k=top_k).
+
+    Args:
+        index (CourseIndex): compiled index of the selected courses
+        n_dels (int): number of DELs selected
+        n_opels (int): number of OPELs selected
+        n_huels (int): number of HUELs selected
+        free_days (list): list of days to be free if possible
+        lite_order (list): increasing order of how lite you want days to be (earlier means more lite)
+        filter (bool, optional): whether to filter or to just sort. Defaults to False.
+        strong (bool, optional): whether to use strong filter or not. Defaults to False.
+        top_k (int, optional): number of best timetables to keep. Defaults to None (keep all).
+        n_workers (int, optional): number of worker processes. Defaults to None (number of cores).
+
+    Returns:
+        list: list of timetables after filtering, as (free days matched, daily scores (M, T, W, Th, F, S, Su), timetable), in the same order as day_wise_filter
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    # a few shards per worker, so that one slow shard does not keep the others idle
+    shards = get_shards(index, n_dels, n_opels, n_huels, 4 * n_workers)
+    with ProcessPoolExecutor(
+        n_workers, initializer=init_worker, initargs=(index,)
+    ) as executor:
+        results = executor.map(
+            search_shard,
+            shards,
+            *[
+                [arg] * len(shards)
+                for arg in (free_days, lite_order, filter, strong, top_k)
+            ],
         )
+        # the shards are in generation order, and the sort is stable, so ties stay in generation order like in day_wise_filter
+        merged = [timetable for result in results for timetable in result]
 
-    if filter:
-        return [i for i in matches_free_days]
+    key = get_rank_key(free_days, lite_order, strong)
+    if top_k is None:
+        return sorted(merged, key=key)
+    return heapq.nsmallest(top_k, merged, key=key)
 
-    else:
-        return [i for i in matches_free_days] + [i for i in others]
 
+def stream_timetables(
+    index: Annotated[CourseIndex, "compiled index of the selected courses"],
+    n_dels: Annotated[int, "number of DELs selected"],
+    n_opels: Annotated[int, "number of OPELs selected"],
+    n_huels: Annotated[int, "number of HUELs selected"],
+    free_days: Annotated[list[str], "list of days to be free if possible"],
+    filter: Annotated[bool, "whether to filter or to just score"] = False,
+    strong: Annotated[bool, "whether to use strong filter or not"] = False,
+) -> Iterator[tuple]:
+    """
+    Function that chains the whole pipeline lazily: generation, removing clashes, removing exam clashes and the free days filter.
+    Every stage consumes and yields one timetable at a time, so memory stays flat no matter how many timetables are explored.
+    The timetables are not sorted (see day_wise_filter for that), and can be passed straight to export_to_json.
 
-def export_to_json(timetables: list, filtered_json: dict, n_export: int = 100) -> None:
+    Args:
+        index (CourseIndex): compiled index of the selected courses
+        n_dels (int): number of DELs selected
+        n_opels (int): number of OPELs selected
+        n_huels (int): number of HUELs selected
+        free_days (list): list of days to be free if possible
+        filter (bool, optional): whether to filter or to just score. Defaults to False.
+        strong (bool, optional): whether to use strong filter or not. Defaults to False.
+
+    Yields:
+        tuple: (number of free days matched, number of classes on each day (M, T, W, Th, F, S, Su), timetable)
+    """
+    timetables = iter_exhaustive_timetables(index, n_dels, n_opels, n_huels)
+    timetables = iter_without_clashes(timetables, index)
+    timetables = iter_without_exam_clashes(timetables, index)
+    yield from iter_day_wise_filter(timetables, index, free_days, filter, strong)
+
+
+def serialize(
+    value: Annotated[object, "value to serialize"],
+    indent: Annotated[int | None, "indentation, None for compact"] = None,
+    level: Annotated[int, "how deep the value is nested"] = 0,
+) -> str:
     """
-    Function that exports your timetables to a json file (in the sorted order)
+    Function that serializes a value to json the way json.dump would write it when nested level deep, so it can be serialized once and written into many places.
+    Compact json (no indentation) is written with orjson when it is installed, as it is a lot faster.
 
     Args:
-        timetables (list): list of timetables
-        filtered_json (dict): filtered json file, i.e, with only courses selected
+        value (object): value to serialize
+        indent (int | None, optional): indentation, None for compact. Defaults to None.
+        level (int, optional): how deep the value is nested (0 for the outermost value). Defaults to 0.
+
+    Returns:
+        str: the value as json
+    """
+    if indent is None:
+        if orjson is not None:
+            return orjson.dumps(value).decode()
+        return json.dumps(value, separators=(",", ":"))
+    # strings in json cannot have a raw newline in them, so every newline is between items and can just be indented further
+    return json.dumps(value, indent=indent).replace("\n", "\n" + " " * indent * level)
+
+
+def serialize_object(
+    items: Annotated[list[tuple[str, str]], "keys and serialized values"],
+    indent: Annotated[int | None, "indentation, None for compact"] = None,
+    level: Annotated[int, "how deep the object is nested"] = 0,
+) -> str:
+    """
+    Function that serializes a json object from its keys and already serialized values (see serialize), the way json.dump would write it when nested level deep
+
+    Args:
+        items (list[tuple[str, str]]): keys and serialized values (serialized one level deeper than the object)
+        indent (int | None, optional): indentation, None for compact. Defaults to None.
+        level (int, optional): how deep the object is nested (0 for the outermost value). Defaults to 0.
+
+    Returns:
+        str: the object as json
+    """
+    if indent is None:
+        return (
+            "{" + ",".join(f"{json.dumps(key)}:{value}" for key, value in items) + "}"
+        )
+    if not items:
+        return "{}"
+    padding = "\n" + " " * indent * (level + 1)
+    return (
+        "{"
+        + ",".join(f"{padding}{json.dumps(key)}: {value}" for key, value in items)
+        + "\n"
+        + " " * indent * level
+        + "}"
+    )
+
+
+def export_to_json(
+    timetables: Iterable,
+    index: CourseIndex,
+    n_export: int = 100,
+    indent: int | None = 4,
+    ndjson: bool = False,
+    references: bool = False,
+    output_file: str = "./files/my_timetables.json",
+) -> None:
+    """
+    Function that exports your timetables to a json file (in the sorted order).
+    Timetables are consumed and written one at a time, and only the first n_export are taken, so it can be fed a lazy pipeline (see stream_timetables) and memory stays flat however many are exported.
+    The schedule of a section and the exams of a course are the same in every timetable, so they are serialized once and the same json is written every time.
+    With references, they are written only once in the whole file instead, and each timetable only refers to its sections, which keeps large exports an order of magnitude smaller (visualize.py reads both formats):
+        {
+            "timetables": [{"free_matched": ..., "daily_scores": [...], "sections": [position in the section table, ...]}, ...],
+            "courses": {course: {"exams": {...}}, ...},
+            "sections": [{"course": ..., "section": ..., "schedule": [...]}, ...]
+        }
+
+    Args:
+        timetables (Iterable): timetables (free days matched, daily scores, timetable)
+        index (CourseIndex): compiled index of the selected courses
         n_export (int, optional): number of timetables to export. Defaults to 100.
+        indent (int | None, optional): indentation of the json, None for compact json. Defaults to 4.
+        ndjson (bool, optional): whether to write one compact timetable per line (newline delimited json) instead of a json list, along with the offset of every line (<output_file>.index.npy) so any one timetable can be read straight away. With references, the tables are on the last line. Defaults to False.
+        references (bool, optional): whether to write the sections once in a table, and the timetables as references to them. Defaults to False.
+        output_file (str, optional): the file to write to. Defaults to "./files/my_timetables.json".
 
     Returns:
         None
     """
-    export = []
-    for timetable in timetables:
-        export_tt = {}
-        export_tt["free_matched"] = timetable[0]
-        export_tt["daily_scores"] = timetable[1]
-        export_tt["timetable"] = {}
-        for course in timetable[2]:
-            export_tt["timetable"][course[0]] = {}
-            export_tt["timetable"][course[0]]["sections"] = {}
-            for sec in course[1]:
-                export_tt["timetable"][course[0]]["sections"][sec] = {}
-                export_tt["timetable"][course[0]]["sections"][sec]["schedule"] = []
-                if course[0] in filtered_json["CDCs"]:
-                    sched = filtered_json["CDCs"][course[0]]["sections"][sec][
-                        "schedule"
-                    ]
-                elif course[0] in filtered_json["DEls"]:
-                    sched = filtered_json["DEls"][course[0]]["sections"][sec][
-                        "schedule"
+    if ndjson:
+        indent = None
+    # how deep each timetable is nested, in the list (of the timetables key with references) or on its own line
+    level = 0 if ndjson else 2 if references else 1
+    # format: {section id: serialized section}, {course id: serialized exams}
+    sections: dict[int, str] = {}
+    exams: dict[int, str] = {}
+
+    def serialize_timetable(timetable: tuple) -> str:
+        courses = []
+        for course, secs in get_timetable_codes(timetable[2], index):
+            course_sections = []
+            for sec in secs:
+                section_id = index.section_ids[(course, sec)]
+                if section_id not in sections:
+                    schedule = [
+                        {"days": sched["days"], "hours": sched["hours"]}
+                        for sched in index.section_schedules[section_id]
                     ]
-                elif course[0] in filtered_json["HUELs"]:
-                    sched = filtered_json["HUELs"][course[0]]["sections"][sec][
-                        "schedule"
-                    ]
-                elif course[0] in filtered_json["OPELs"]:
-                    sched = filtered_json["OPELs"][course[0]]["sections"][sec][
-                        "schedule"
-                    ]
-                else:
-                    raise Exception("Course code not found in any category")
-                for i in range(len(sched)):
-                    export_tt["timetable"][course[0]]["sections"][sec][
-                        "schedule"
-                    ].append(
-                        {
-                            "days": sched[i]["days"],
-                            "hours": sched[i]["hours"],
-                        }
+                    sections[section_id] = serialize(
+                        {"schedule": schedule}, indent, level + 4
                     )
-            if course[0] in filtered_json["CDCs"]:
-                exam = filtered_json["CDCs"][course[0]]["exams"][0]
-            elif course[0] in filtered_json["DEls"]:
-                exam = filtered_json["DEls"][course[0]]["exams"][0]
-            elif course[0] in filtered_json["HUELs"]:
-                exam = filtered_json["HUELs"][course[0]]["exams"][0]
-            elif course[0] in filtered_json["OPELs"]:
-                exam = filtered_json["OPELs"][course[0]]["exams"][0]
+                course_sections.append((sec, sections[section_id]))
+            course_id = index.course_ids[course]
+            if course_id not in exams:
+                exams[course_id] = serialize(
+                    index.course_exams[course_id], indent, level + 3
+                )
+            details = [
+                ("sections", serialize_object(course_sections, indent, level + 3)),
+                ("exams", exams[course_id]),
+            ]
+            courses.append((course, serialize_object(details, indent, level + 2)))
+        return serialize_object(
+            [
+                ("free_matched", serialize(timetable[0], indent, level + 1)),
+                ("daily_scores", serialize(timetable[1], indent, level + 1)),
+                ("timetable", serialize_object(courses, indent, level + 1)),
+            ],
+            indent,
+            level,
+        )
+
+    # format: {section id: position in the section table}, {course: its entry in the course table}
+    section_refs: dict[int, int] = {}
+    course_table: dict[str, dict] = {}
+
+    def serialize_references(timetable: tuple) -> str:
+        refs = []
+        for k in timetable[2]:
+            course, secs = index.combination_options[k]
+            if course not in course_table:
+                exams = index.course_exams[index.combination_courses[k]]
+                course_table[course] = {"exams": exams}
+            for sec in secs:
+                section_id = index.section_ids[(course, sec)]
+                refs.append(section_refs.setdefault(section_id, len(section_refs)))
+        return serialize_object(
+            [
+                ("free_matched", serialize(timetable[0], indent, level + 1)),
+                ("daily_scores", serialize(timetable[1], indent, level + 1)),
+                ("sections", serialize(refs, indent, level + 1)),
+            ],
+            indent,
+            level,
+        )
+
+    def padding(level: int) -> str:
+        # what json.dump writes before an item nested level deep
+        return "" if indent is None else "\n" + " " * indent * level
+
+    def get_section_table() -> list[dict]:
+        # sections referred to, in the order of their references
+        return [
+            {
+                "course": index.course_codes[index.section_courses[section_id]],
+                "section": index.section_names[section_id],
+                "schedule": [
+                    {"days": sched["days"], "hours": sched["hours"]}
+                    for sched in index.section_schedules[section_id]
+                ],
+            }
+            for section_id in section_refs
+        ]
+
+    n_exported = 0
+    if ndjson:
+        # where every line starts (and where the last one ends), so a timetable can be read without reading the ones before it (see visualize.load_timetable)
+        offsets = [0]
+        # no newline translation, so the offsets are the same on every platform
+        with open(output_file, "w", encoding="utf-8", newline="") as f:
+            for timetable in timetables:
+                if references:
+                    line = serialize_references(timetable) + "\n"
+                else:
+                    line = serialize_timetable(timetable) + "\n"
+                f.write(line)
+                offsets.append(offsets[-1] + len(line.encode()))
+                n_exported += 1
+                if n_exported == n_export:
+                    break
+            if references:
+                # the tables go on the last line, after every section has been referred to
+                tables = [
+                    ("courses", serialize(course_table)),
+                    ("sections", serialize(get_section_table())),
+                ]
+                line = serialize_object(tables) + "\n"
+                f.write(line)
+                offsets.append(offsets[-1] + len(line.encode()))
+        np.save(output_file + ".index.npy", np.array(offsets, dtype=np.int64))
+        return
+
+    separator = ":" if indent is None else ": "
+    with open(output_file, "w") as f:
+        if references:
+            f.write("{" + padding(1) + '"timetables"' + separator)
+        f.write("[")
+        for timetable in timetables:
+            f.write(("," if n_exported else "") + padding(level))
+            if references:
+                f.write(serialize_references(timetable))
             else:
-                raise Exception("Course code not found in any category")
-            export_tt["timetable"][course[0]]["exams"] = exam
-        export.append(export_tt)
-        if len(export) == n_export:
-            break
-    json.dump(export, open("./files/my_timetables.json", "w"), indent=4)
+                f.write(serialize_timetable(timetable))
+            n_exported += 1
+            if n_exported == n_export:
+                break
+        f.write((padding(level - 1) if n_exported else "") + "]")
+        if references:
+            tables = (("courses", course_table), ("sections", get_section_table()))
+            for key, table in tables:
+                f.write("," + padding(1) + json.dumps(key) + separator)
+                f.write(serialize(table, indent, 1))
+            f.write(padding(0) + "}")
 
 
 if __name__ == "__main__":
@@ -548,55 +1504,112 @@ if __name__ == "__main__":
 
     lite_order = ["S", "Su", "M", "T", "W", "Th", "F"]
 
-    # load the json file created
-    tt_json = json.load(open("./files/timetable.json", "r"))
-
-    filtered_json = get_filtered_json(tt_json, CDCs, DEls, HUELs, OPELs)
+    # load the json file created, only the selected courses from its compiled form (compiled again if the json file changed)
+    if not is_compiled("./files/timetable.json", "./files/compiled"):
+        compile_timetable("./files/timetable.json", "./files/compiled")
 
-    exhaustive_list_of_timetables = generate_exhaustive_timetables(
-        filtered_json, nDels, nOpels, nHuels
+    filtered_json, sections, exams = load_compiled_timetable(
+        "./files/compiled", CDCs, DEls, HUELs, OPELs
     )
 
-    timetables_without_clashes = remove_clashes(
-        exhaustive_list_of_timetables, filtered_json
+    index = compile_course_index(filtered_json, sections, exams)
+
+    n_without_class_clashes, n_without_clashes = count_timetables(
+        index, nDels, nOpels, nHuels
     )
 
     print(
         "Number of timetables without clashes (classes):",
-        len(timetables_without_clashes),
+        n_without_class_clashes,
     )
 
-    timetables_without_clashes = remove_exam_clashes(
-        timetables_without_clashes, filtered_json
+    # number of timetables to export
+    n_export = 100
+
+    # written to disk as they are generated and read back lazily, so they do not all have to fit in memory
+    # they are cached by the selected courses, so changing only the free days or the lite order skips straight to ranking
+    cache_key = get_cache_key(filtered_json, nDels, nOpels, nHuels)
+    timetables_without_clashes = load_cached_timetables(
+        "./files/cache", cache_key, index
     )
+    n_courses = len(CDCs) + nDels + nOpels + nHuels
+    if (
+        timetables_without_clashes is None
+        and get_result_store_size(n_without_clashes, n_courses, index) <= CACHE_SIZE
+    ):
+        timetables_without_clashes = save_cached_timetables(
+            "./files/cache",
+            cache_key,
+            generate_timetables_without_clashes(index, nDels, nOpels, nHuels),
+            index,
+        )
 
     print(
         "Number of timetables without clashes (classes and exams):",
-        len(timetables_without_clashes),
+        n_without_clashes,
     )
 
-    in_my_preference_order = day_wise_filter(
-        timetables_without_clashes,
-        filtered_json,
-        free_days,
-        lite_order,
-        filter=False,
-        strong=False,
-    )
+    lowest_match = None
+    if timetables_without_clashes is not None:
+        # ranked from the daily loads and hours stored with them, without going through the timetables again
+        rank_order, n_free = get_rank_order(
+            timetables_without_clashes.loads,
+            timetables_without_clashes.day_hours,
+            free_days,
+            lite_order,
+            filter=False,
+            strong=False,
+        )
 
-    print("Number of timetables after filter: ", len(in_my_preference_order))
+        print("Number of timetables after filter: ", len(rank_order))
+
+        # only the timetables exported (and the lowest match) are read from the store
+        in_my_preference_order = get_ranked_timetables(
+            timetables_without_clashes, rank_order[:n_export], n_free
+        )
+        if len(rank_order) > 0:
+            lowest_match = get_ranked_timetables(
+                timetables_without_clashes, rank_order[-1:], n_free
+            )[0]
+    else:
+        # too many to cache (eg: first year courses), so only the best ones exported are searched for, without going through all of them
+        in_my_preference_order = find_best_timetables(
+            index,
+            nDels,
+            nOpels,
+            nHuels,
+            free_days,
+            lite_order,
+            n_export,
+            filter=False,
+            strong=False,
+        )
 
     if len(in_my_preference_order) > 0:
         print(
             "-----------------------------------------------------",
             "\nHighest match:\n",
-            in_my_preference_order[0],
-            "\n\n",
-            "-----------------------------------------------------",
-            "\nLowest match:\n",
-            in_my_preference_order[-1],
+            (
+                *in_my_preference_order[0][:2],
+                get_timetable_codes(in_my_preference_order[0][2], index),
+            ),
         )
+        if lowest_match is not None:
+            print(
+                "\n",
+                "-----------------------------------------------------",
+                "\nLowest match:\n",
+                (*lowest_match[:2], get_timetable_codes(lowest_match[2], index)),
+            )
     else:
         print("No timetables found")
 
-    export_to_json(in_my_preference_order, filtered_json)
+    # sections written once and referred to by the timetables, one timetable per line, so visualize.py can read any one of them straight away
+    export_to_json(
+        in_my_preference_order,
+        index,
+        n_export=n_export,
+        ndjson=True,
+        references=True,
+        output_file="./files/my_timetables.ndjson",
+    )
@@ -1,5 +1,7 @@
 import pandas as pd
+import numpy as np
 import json
+import os
 import tabulate
 
 conversion_dict = {
@@ -19,15 +21,173 @@ conversion_dict = {
     14: "9 - 9:50PM",
 }
 
+# days and hours the expanded class schedule always has, others are added after them if some class is on them
+grid_days = ["M", "T", "W", "Th", "F", "S"]
+grid_hours = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+
+
+def get_timetable(timetables: list[dict] | dict, index: int) -> dict:
+    """
+    Function to get a timetable from the exported timetables, in either format written by export_to_json (a list of timetables, or a table of sections and timetables referring to them)
+
+    Args:
+        timetables (list[dict] | dict): Exported timetables
+        index (int): Index of the timetable
+
+    Returns:
+        dict: The timetable, as {course: {"sections": {section: {"schedule": [...]}}, "exams": {...}}}
+    """
+    if isinstance(timetables, list):
+        return timetables[index]["timetable"]
+    # only the sections of this timetable are looked up in the table
+    timetable = {}
+    for ref in timetables["timetables"][index]["sections"]:
+        section = timetables["sections"][ref]
+        course = section["course"]
+        if course not in timetable:
+            timetable[course] = {
+                "sections": {},
+                "exams": timetables["courses"][course]["exams"],
+            }
+        timetable[course]["sections"][section["section"]] = {
+            "schedule": section["schedule"]
+        }
+    return timetable
+
+
+def load_timetables(file: str, indices: list[int]) -> list[dict] | dict:
+    """
+    Function to load only some timetables from timetables exported as ndjson, seeking straight to their lines with the offsets exported next to it (<file>.index.npy), instead of loading the whole file
+    Timetables exported as a single json (without offsets) are loaded whole, and only those timetables are kept.
+
+    Args:
+        file (str): Path to the ndjson (or json) file
+        indices (list[int]): Indices of the timetables
+
+    Returns:
+        list[dict] | dict: Exported timetables with only those timetables in them (in the order of indices), in the same format as the file (see get_timetable)
+    """
+    if not os.path.exists(file + ".index.npy"):
+        with open(file, "r") as f:
+            exported = json.load(f)
+        if isinstance(exported, list):
+            return [exported[index] for index in indices]
+        timetables = [exported["timetables"][index] for index in indices]
+        return {**exported, "timetables": timetables}
+
+    offsets = np.load(file + ".index.npy", mmap_mode="r")
+    with open(file, "rb") as f:
+
+        def read_line(line: int) -> dict:
+            f.seek(offsets[line])
+            return json.loads(f.read(offsets[line + 1] - offsets[line]))
+
+        n_timetables = len(offsets) - 1
+        tables = None
+        if n_timetables > 0:
+            # timetables exported as references have the tables on the last line
+            last = read_line(n_timetables - 1)
+            if "courses" in last:
+                tables = last
+                n_timetables -= 1
+        timetables = []
+        for index in indices:
+            if not -n_timetables <= index < n_timetables:
+                raise IndexError("timetable index out of range")
+            timetables.append(read_line(index % n_timetables))
+
+    if tables is None:
+        return timetables
+    return {"timetables": timetables, **tables}
+
+
+def load_timetable(file: str, index: int) -> list[dict] | dict:
+    """
+    Function to load only one timetable from timetables exported as ndjson (see load_timetables)
+
+    Args:
+        file (str): Path to the ndjson (or json) file
+        index (int): Index of the timetable
+
+    Returns:
+        list[dict] | dict: Exported timetables with only that one timetable in them (at index 0), in the same format as the file (see get_timetable)
+    """
+    return load_timetables(file, [index])
+
+
+def get_class_grids(timetables: list[dict]) -> pd.DataFrame:
+    """
+    Function to fill the expanded class schedules (days by hours) of many timetables at once.
+    Every class is put into one preallocated NumPy array of strings, which is turned into a dataframe once, instead of writing the dataframe a cell at a time.
+    Days and hours outside the usual ones are added after them, in the order they first come up, and a later class on the same day and hour overwrites an earlier one.
+
+    Args:
+        timetables (list[dict]): Timetables, as returned by get_timetable
+
+    Returns:
+        pd.DataFrame: Class schedules, indexed by (position in timetables, day), with one column per hour
+    """
+    days = list(grid_days)
+    hours = list(grid_hours)
+    day_positions = {day: i for i, day in enumerate(days)}
+    hour_positions = {hour: i for i, hour in enumerate(hours)}
+    # format: [(position of the timetable, of the day, of the hour), ...] and what goes in each of those cells
+    cells = []
+    texts = []
+    for t, timetable in enumerate(timetables):
+        for course in timetable:
+            for section in timetable[course]["sections"]:
+                for schedule in timetable[course]["sections"][section]["schedule"]:
+                    for day in schedule["days"]:
+                        if day not in day_positions:
+                            day_positions[day] = len(days)
+                            days.append(day)
+                        for hour in schedule["hours"]:
+                            if hour not in hour_positions:
+                                hour_positions[hour] = len(hours)
+                                hours.append(hour)
+                            cells.append((t, day_positions[day], hour_positions[hour]))
+                            texts.append(course + " " + section)
+
+    width = max((len(text) for text in texts), default=1)
+    grid = np.full((len(timetables), len(days), len(hours)), "", dtype=f"<U{width}")
+    if cells:
+        # when a cell is assigned more than once, the last value is the one kept
+        grid[tuple(np.array(cells).T)] = texts
+    return pd.DataFrame(
+        grid.reshape(-1, len(hours)),
+        index=pd.MultiIndex.from_product([range(len(timetables)), days]),
+        columns=[conversion_dict[hour] for hour in hours],
+        dtype=object,
+    )
+
+
+def get_exam_rows(timetable: dict, exam: str) -> list[list[str]]:
+    """
+    Function to get the exam schedule of a timetable, sorted by date
+
+    Args:
+        timetable (dict): Timetable, as returned by get_timetable
+        exam (str): The exam (midsem or compre)
+
+    Returns:
+        list[list[str]]: Course, date and time of the exam of each course
+    """
+    rows = []
+    for course in timetable:
+        details = timetable[course]["exams"][exam].split(" ")
+        rows.append([course, details[0], " ".join(details[1:])])
+    return sorted(rows, key=lambda row: row[1])
+
 
 def convert_timetable_to_pandas_dataframe(
-    timetables: list[dict], index: int, condensed: bool = True
+    timetables: list[dict] | dict, index: int, condensed: bool = True
 ):
     """
     Function to convert timetable to pandas dataframe for better visualization
 
     Args:
-        timetables (list[dict]): List of timetables
+        timetables (list[dict] | dict): List of timetables (or the timetables exported as references, see get_timetable)
         index (int): Index of timetable to be converted to pandas dataframe
         condensed (bool, optional): Whether to condense the dataframe or not. Defaults to True.
 
@@ -36,33 +196,15 @@ def convert_timetable_to_pandas_dataframe(
         midsem_df (pd.DataFrame): Dataframe containing midsem schedule
         compre_df (pd.DataFrame): Dataframe containing compre schedule
     """
-    timetable = timetables[index]
-    timetable = timetable["timetable"]
+    timetable = get_timetable(timetables, index)
     if condensed:
-        class_df = pd.DataFrame(columns=["Course", "Section", "Days", "Time"])
-    else:
-        class_df = pd.DataFrame(
-            columns=[
-                "8 - 8:50AM",
-                "9 - 9:50AM",
-                "10 - 10:50AM",
-                "11 - 11:50AM",
-                "12 - 12:50PM",
-                "1 - 1:50PM",
-                "2 - 2:50PM",
-                "3 - 3:50PM",
-                "4 - 4:50PM",
-            ],
-            index=["M", "T", "W", "Th", "F", "S"],
-        )
-    midsem_df = pd.DataFrame(columns=["Course", "Date", "Time"])
-    compre_df = pd.DataFrame(columns=["Course", "Date", "Time"])
-
-    for course in timetable:
-        for section in timetable[course]["sections"]:
-            for schedule in timetable[course]["sections"][section]["schedule"]:
-                if condensed:
-                    temp = pd.DataFrame(
+        # rows of the dataframe, collected first and turned into a dataframe once at the end
+        # (concatenating a row at a time copies the whole dataframe for every row)
+        class_rows = []
+        for course in timetable:
+            for section in timetable[course]["sections"]:
+                for schedule in timetable[course]["sections"][section]["schedule"]:
+                    class_rows.append(
                         {
                             "Course": course,
                             "Section": section,
@@ -70,70 +212,148 @@ def convert_timetable_to_pandas_dataframe(
                             "Time": ", ".join(
                                 [conversion_dict[i] for i in schedule["hours"]]
                             ),
-                        },
-                        index=[0],
+                        }
                     )
-                    class_df = pd.concat([class_df, temp])
-                else:
-                    for day in schedule["days"]:
-                        for hour in schedule["hours"]:
-                            class_df.loc[day, conversion_dict[hour]] = (
-                                course + " " + section
-                            )
-        exam_details = timetable[course]["exams"]
-
-        temp = pd.DataFrame(
-            {
-                "Course": course,
-                "Date": exam_details["midsem"].split(" ")[0],
-                "Time": " ".join(exam_details["midsem"].split(" ")[1:]),
-            },
-            index=[0],
-        )
-
-        midsem_df = pd.concat([midsem_df, temp])
-
-        temp = pd.DataFrame(
-            {
-                "Course": course,
-                "Date": exam_details["compre"].split(" ")[0],
-                "Time": " ".join(exam_details["compre"].split(" ")[1:]),
-            },
-            index=[0],
+        class_df = pd.DataFrame(
+            class_rows, columns=["Course", "Section", "Days", "Time"]
         )
-
-        compre_df = pd.concat([compre_df, temp])
-    if condensed:
         class_df = class_df.sort_values(by=["Days", "Time"])
         class_df.reset_index(drop=True, inplace=True)
         class_df.index += 1
 
     else:
-        class_df.fillna("", inplace=True)
+        class_df = get_class_grids([timetable]).droplevel(0)
 
-    midsem_df = midsem_df.sort_values(by=["Date"])
-    midsem_df.reset_index(drop=True, inplace=True)
+    midsem_df = pd.DataFrame(
+        get_exam_rows(timetable, "midsem"), columns=["Course", "Date", "Time"]
+    )
     midsem_df.index += 1
 
-    compre_df = compre_df.sort_values(by=["Date"])
-    compre_df.reset_index(drop=True, inplace=True)
+    compre_df = pd.DataFrame(
+        get_exam_rows(timetable, "compre"), columns=["Course", "Date", "Time"]
+    )
     compre_df.index += 1
 
     return class_df, midsem_df, compre_df
 
 
+def convert_timetables_to_pandas_dataframes(
+    timetables: list[dict] | dict, indices: list[int]
+):
+    """
+    Function to convert many timetables to pandas dataframes at once (eg: the best 100), to review them in bulk. The class schedules are expanded, see get_class_grids.
+
+    Args:
+        timetables (list[dict] | dict): List of timetables (or the timetables exported as references, see get_timetable)
+        indices (list[int]): Indices of the timetables to be converted
+
+    Returns:
+        class_df (pd.DataFrame): Dataframe containing the class schedules, indexed by (timetable index, day)
+        midsem_df (pd.DataFrame): Dataframe containing the midsem schedules, with the timetable index of each row
+        compre_df (pd.DataFrame): Dataframe containing the compre schedules, with the timetable index of each row
+    """
+    selected = [get_timetable(timetables, index) for index in indices]
+    class_df = get_class_grids(selected)
+    n_days = len(class_df) // max(len(indices), 1)
+    class_df.index = pd.MultiIndex.from_arrays(
+        [np.repeat(indices, n_days), class_df.index.get_level_values(1)],
+        names=["Timetable", "Day"],
+    )
+
+    exam_dfs = []
+    for exam in ("midsem", "compre"):
+        rows = [
+            [index, *row]
+            for index, timetable in zip(indices, selected)
+            for row in get_exam_rows(timetable, exam)
+        ]
+        exam_dfs.append(
+            pd.DataFrame(rows, columns=["Timetable", "Course", "Date", "Time"])
+        )
+
+    return class_df, exam_dfs[0], exam_dfs[1]
+
+
+def render_timetables(
+    timetables: list[dict] | dict,
+    indices: list[int],
+    output_file: str,
+    format: str = "text",
+) -> None:
+    """
+    Function to render many timetables to a file at once, to review them in bulk instead of visualizing one at a time
+
+    Args:
+        timetables (list[dict] | dict): List of timetables (or the timetables exported as references, see get_timetable)
+        indices (list[int]): Indices of the timetables to be rendered (each one once)
+        output_file (str): Path to the file to render to. For csv, the class, midsem and compre schedules go to three files, named <output_file without extension>_classes.csv, _midsem.csv and _compre.csv.
+        format (str, optional): text (tables as the visualize script prints them), html or csv. Defaults to "text".
+    """
+    class_df, midsem_df, compre_df = convert_timetables_to_pandas_dataframes(
+        timetables, indices
+    )
+    if format == "csv":
+        name = os.path.splitext(output_file)[0]
+        class_df.to_csv(name + "_classes.csv")
+        midsem_df.to_csv(name + "_midsem.csv", index=False)
+        compre_df.to_csv(name + "_compre.csv", index=False)
+        return
+    if format not in ("text", "html"):
+        raise Exception("Unknown format " + format)
+
+    with open(output_file, "w") as f:
+        for index in indices:
+            tables = [
+                ("Class Schedule", class_df.loc[index].rename_axis(None)),
+                ("Midsem Schedule", midsem_df[midsem_df["Timetable"] == index]),
+                ("Compre Schedule", compre_df[compre_df["Timetable"] == index]),
+            ]
+            if format == "html":
+                f.write(f"<h2>Timetable {index}</h2>\n")
+            else:
+                f.write("======================================================\n")
+                f.write(f"Timetable {index}\n\n")
+            for title, df in tables:
+                # numbered from 1 for each timetable, like convert_timetable_to_pandas_dataframe
+                if title != "Class Schedule":
+                    df = df.drop(columns="Timetable").reset_index(drop=True)
+                    df.index += 1
+                if format == "html":
+                    f.write(f"<h3>{title}</h3>\n" + df.to_html() + "\n")
+                else:
+                    f.write(f"{title}:\n\n")
+                    f.write(
+                        tabulate.tabulate(df, headers="keys", tablefmt="fancy_grid")
+                    )
+                    f.write("\n\n")
+
+
 if __name__ == "__main__":
     index = 0
-    with open("./files/my_timetables.json", "r") as f:
-        timetables = json.load(f)
-    dfs = convert_timetable_to_pandas_dataframe(timetables, index, False)
-    print("======================================================\n")
-    print("Class Schedule:\n\n")
-    print(tabulate.tabulate(dfs[0], headers="keys", tablefmt="fancy_grid"))
-    print("------------------------------------------------------\n")
-    print("\nMidsem Schedule:\n\n")
-    print(tabulate.tabulate(dfs[1], headers="keys", tablefmt="fancy_grid"))
-    print("------------------------------------------------------\n")
-    print("\nCompre Schedule:\n\n")
-    print(tabulate.tabulate(dfs[2], headers="keys", tablefmt="fancy_grid"))
-    print("======================================================\n")
+    file = "./files/my_timetables.ndjson"
+    if not os.path.exists(file + ".index.npy"):
+        # not exported as ndjson yet, eg: a fresh checkout, so the json export is read instead
+        file = "./files/my_timetables.json"
+    # set to render the best n_render timetables to a file at once instead (text, html or csv, see render_timetables)
+    n_render = 0
+    if n_render:
+        render_timetables(
+            load_timetables(file, list(range(n_render))),
+            list(range(n_render)),
+            "./files/my_timetables.txt",
+            "text",
+        )
+    else:
+        # only the timetable at index is read from the file, if exported as ndjson
+        timetables = load_timetable(file, index)
+        dfs = convert_timetable_to_pandas_dataframe(timetables, 0, False)
+        print("======================================================\n")
+        print("Class Schedule:\n\n")
+        print(tabulate.tabulate(dfs[0], headers="keys", tablefmt="fancy_grid"))
+        print("------------------------------------------------------\n")
+        print("\nMidsem Schedule:\n\n")
+        print(tabulate.tabulate(dfs[1], headers="keys", tablefmt="fancy_grid"))
+        print("------------------------------------------------------\n")
+        print("\nCompre Schedule:\n\n")
+        print(tabulate.tabulate(dfs[2], headers="keys", tablefmt="fancy_grid"))
+        print("======================================================\n")